@@ -1,20 +1,376 @@
 from helpers import Map, load_map_10, load_map_40, show_map
+from compact_map import require_two_way
+from landmarks import dijkstra
+from collections import OrderedDict
+import heapq
+import itertools
 import math
+import time
+
+
+class SearchCancelled(Exception):
+    """Raised by a search whose should_stop callback asked it to stop"""
+
+
+class HeapOpenSet():
+    """Open set backed by a binary heap of (fScore, node) entries.
+
+    Decrease-key is lazy: improving a node's fScore pushes a new entry and the
+    outdated one is skipped when it reaches the top of the heap."""
+    def __init__(self):
+        self._heap = []
+        self._members = set()
+        self.pushes = 0     # also the tie-breaker, so nodes are never compared
+
+    def __contains__(self, node):
+        return node in self._members
+
+    def __len__(self):
+        return len(self._members)
+
+    def __iter__(self):
+        return iter(self._members)
+
+    def add(self, node):
+        """Mark node as discovered; it is queued once it gets an fScore via push"""
+        self._members.add(node)
+
+    def remove(self, node):
+        """Remove node from the open set, its heap entries become stale"""
+        self._members.discard(node)
+
+    def push(self, node, f):
+        """Queue node with fScore f"""
+        self._members.add(node)
+        self.pushes += 1
+        heapq.heappush(self._heap, (f, self.pushes, node))
+
+    @property
+    def pops(self):
+        return self.pushes - len(self._heap)
+
+    def pop_lowest(self, fScore):
+        """Pop and return the member with the lowest fScore, skipping stale entries"""
+        heap = self._heap
+        while heap:
+            f, _, node = heapq.heappop(heap)
+            if node in self._members and f == fScore[node]:
+                return node
+        return None
+
+    def peek_lowest(self, fScore):
+        """Return the member with the lowest fScore without removing it, or None"""
+        heap = self._heap
+        while heap:
+            f, _, node = heap[0]
+            if node in self._members and f == fScore[node]:
+                return node
+            heapq.heappop(heap)
+        return None
+
+
+class SearchBuffers():
+    """Per-node search arrays that are reused from one query to the next.
+
+    Every entry carries the generation that last wrote it, so starting a new
+    query is a counter increment instead of resetting all V entries to
+    infinity: entries stamped by an older generation read as unvisited."""
+    def __init__(self, size):
+        self.size = size
+        self.gScore = [0.0] * size
+        self.cameFrom = [-1] * size
+        self.stamp = [0] * size         # generation that last set gScore/cameFrom
+        self.closed = [0] * size        # generation in which the node was expanded
+        self.hScore = [0.0] * size
+        self.hStamp = [0] * size        # generation that last computed hScore
+        self.generation = 0
+
+    def next_generation(self):
+        """Start a new query, invalidating everything written so far"""
+        self.generation += 1
+        return self.generation
+
+    def path_to(self, node):
+        """Walk cameFrom back from node and return the path in travel order"""
+        path = [node]
+        while self.cameFrom[node] != -1:
+            node = self.cameFrom[node]
+            path.append(node)
+        path.reverse()
+        return path
+
+
+class ShortestPathTree():
+    """Shortest paths from one source to every intersection.
+
+    distances[v] is the cost from source to v (infinity if unreachable) and
+    predecessors[v] the node before v on that path (-1 for the source and
+    unreachable nodes). Both are flat arrays, 12 bytes per intersection."""
+    def __init__(self, source, distances, predecessors):
+        self.source = source
+        self.distances = distances
+        self.predecessors = predecessors
+
+    def distance_to(self, target):
+        return self.distances[target]
+
+    def path_to(self, target):
+        """Return the path from source to target in O(path length), or None if unreachable"""
+        if self.distances[target] == float('inf'):
+            return None
+        path = [target]
+        while target != self.source:
+            target = self.predecessors[target]
+            path.append(target)
+        path.reverse()
+        return path
+
 
 class PathPlanner():
-    """Construct a PathPlanner Object"""
-    def __init__(self, M, start=None, goal=None):
+    """Construct a PathPlanner Object
+
+    open_set selects the open set implementation: "set" scans a Python set for
+    the lowest fScore on every pop, "heap" uses HeapOpenSet and keeps each pop
+    at O(log V).
+
+    bidirectional=True grows a frontier from both start and goal and stops
+    when they provably cannot improve on the best meeting point found. It
+    needs two-way roads, as load_map_graph makes them.
+
+    cache is an optional route_cache.RouteCache; run_search answers from it
+    when it can and stores what it computes. set_map invalidates the routes
+    of the map being replaced.
+
+    heuristic is an optional object with a lower_bound(node, target) method,
+    such as a landmarks.LandmarkTable. The estimate used is the larger of its
+    bound and the straight-line distance.
+
+    weight > 1 turns run_search and search_many into weighted A*: nodes are
+    ranked by g + weight * h, which expands far fewer nodes and returns a
+    path costing at most weight times the optimum. anytime_search starts
+    from such a path and improves it until a deadline.
+
+    components is an optional partition.ComponentIndex; queries between
+    different components are then answered "no path" without searching.
+
+    stats is an optional search_stats.SearchStats that records expansions,
+    relaxations, open set size, heap operations and phase timings of every
+    query.
+
+    Road costs come from the map's precomputed road_lengths, and heuristic
+    values are computed once per node for the active goal, so a relaxation
+    is a pair of list reads."""
+    OPEN_SETS = ("set", "heap")
+    TREE_CACHE_SIZE = 8     # shortest path trees kept by shortest_path_tree(cache=True)
+
+    def __init__(self, M, start=None, goal=None, open_set="set", bidirectional=False, heuristic=None,
+                 cache=None, stats=None, weight=1.0, components=None):
         """ """
+        if open_set not in self.OPEN_SETS:
+            raise ValueError("open_set must be one of %s, got %r" % (", ".join(self.OPEN_SETS), open_set))
+        if weight < 1.0:
+            raise ValueError("weight must be at least 1, got %r" % weight)
+        if bidirectional and weight != 1.0:
+            raise ValueError("bidirectional search does not support a weight")
+        if bidirectional:
+            require_two_way(M, "bidirectional search")
         self.map = M
         self.start= start
         self.goal = goal
+        self.open_set = open_set
+        self.bidirectional = bidirectional
+        self.heuristic = heuristic
+        self.cache = cache
+        self.stats = stats
+        self.weight = weight
+        self.components = components
+        self.hScores = {}
         self.closedSet = self.create_closedSet() if goal != None and start != None else None
         self.openSet = self.create_openSet() if goal != None and start != None else None
         self.cameFrom = self.create_cameFrom() if goal != None and start != None else None
         self.gScore = self.create_gScore() if goal != None and start != None else None
         self.fScore = self.create_fScore() if goal != None and start != None else None
         self.path = self.run_search() if self.map and self.start != None and self.goal != None else None
-    
+
+    def search_many(self, pairs, should_stop=None):
+        """Answer many (start, goal) queries against the current map.
+
+        Returns (paths, costs) lists in the order of pairs. Unreachable goals
+        get a path of None and a cost of infinity. The search arrays are
+        allocated once and reused for every query.
+
+        should_stop, if given, is polled every few hundred expansions; when it
+        returns True the search raises SearchCancelled."""
+        buffers = self._search_buffers()
+        paths = []
+        costs = []
+        for start, goal in pairs:
+            record = self.stats.begin("astar-buffered", start, goal) if self.stats is not None else None
+            cost = self._buffered_astar(buffers, start, goal, should_stop, record)
+            paths.append(buffers.path_to(goal) if cost != float('inf') else None)
+            costs.append(cost)
+            if record is not None:
+                record.lap("path")
+                self.stats.end(record, cost)
+        return paths, costs
+
+    def distance_matrix(self, sources, targets):
+        """Return the shortest path cost from every source to every target.
+
+        Each source costs one Dijkstra search that stops as soon as all
+        targets are settled, rather than one search per pair."""
+        buffers = self._search_buffers()
+        rows = []
+        for source in sources:
+            record = self.stats.begin("dijkstra-targets", source, None) if self.stats is not None else None
+            rows.append(self._buffered_dijkstra(buffers, source, targets, record))
+            if record is not None:
+                reached = [cost for cost in rows[-1] if cost != float('inf')]
+                record.reached = len(reached)
+                # the row only counts as a miss when no target is reachable at all
+                self.stats.end(record, max(reached) if reached else (float('inf') if targets else 0.0))
+        return rows
+
+    def shortest_path_tree(self, start=None, cache=False):
+        """Run Dijkstra once from start (default: the planner's start) to every intersection.
+
+        Returns a ShortestPathTree from which any target's path is read off
+        without searching again. A tree takes 12 bytes per intersection, so
+        trees are only kept when cache is True, and then only the
+        TREE_CACHE_SIZE most recently used ones of the current map."""
+        start = self.start if start is None else start
+        trees = getattr(self, '_trees', None)
+        if trees is None or self._trees_map is not self.map:
+            trees = self._trees = OrderedDict()
+            self._trees_map = self.map
+        tree = trees.get(start)
+        if tree is not None:
+            trees.move_to_end(start)
+            return tree
+        distances, predecessors, _ = dijkstra(self.map, start)
+        tree = ShortestPathTree(start, distances, predecessors)
+        if cache:
+            trees[start] = tree
+            while len(trees) > self.TREE_CACHE_SIZE:
+                trees.popitem(last=False)
+        return tree
+
+    def _search_buffers(self):
+        """Return the SearchBuffers for the current map, allocating them on first use"""
+        buffers = getattr(self, '_buffers', None)
+        if buffers is None or buffers.size != len(self.map.intersections):
+            buffers = self._buffers = SearchBuffers(len(self.map.intersections))
+        return buffers
+
+    def _buffered_astar(self, buffers, start, goal, should_stop=None, record=None):
+        """A* from start to goal on reusable buffers, returns the path cost"""
+        if self.components is not None and not self.components.connected(start, goal):
+            if record is not None:
+                record.lap("search")
+            return float('inf')
+        generation = buffers.next_generation()
+        gScore, cameFrom, stamp, closed = buffers.gScore, buffers.cameFrom, buffers.stamp, buffers.closed
+        gScore[start] = 0.0
+        cameFrom[start] = -1
+        stamp[start] = generation
+        hScore, hStamp = buffers.hScore, buffers.hStamp
+        roads, road_lengths = self.map.roads, self.map.road_lengths
+        weight = self.weight
+        heap = [(self.estimate_between(start, goal) * weight, start)]
+        instrumented = should_stop is not None or record is not None
+        expanded = stale = relaxed = open_peak = 0
+        cost = float('inf')
+        while heap:
+            f, current = heapq.heappop(heap)
+            if closed[current] == generation:
+                stale += 1
+                continue    # stale entry
+            if current == goal:
+                cost = gScore[goal]
+                break
+            closed[current] = generation
+            if instrumented:
+                expanded += 1
+                if should_stop is not None and expanded % 256 == 0 and should_stop():
+                    raise SearchCancelled()
+                if record is not None:
+                    relaxed += len(roads[current])
+                    open_peak = max(open_peak, len(heap) + 1)
+            g = gScore[current]
+            for neighbor, length in zip(roads[current], road_lengths[current]):
+                if closed[neighbor] == generation:
+                    continue
+                tentative = g + length
+                if stamp[neighbor] == generation and tentative >= gScore[neighbor]:
+                    continue
+                gScore[neighbor] = tentative
+                cameFrom[neighbor] = current
+                stamp[neighbor] = generation
+                if hStamp[neighbor] != generation:
+                    hScore[neighbor] = self.estimate_between(neighbor, goal) * weight
+                    hStamp[neighbor] = generation
+                heapq.heappush(heap, (tentative + hScore[neighbor], neighbor))
+        if record is not None:
+            record.expanded += expanded
+            record.relaxed += relaxed
+            record.open_peak = max(record.open_peak, open_peak)
+            pops = expanded + stale + (cost != float('inf'))
+            record.heap_pops += pops
+            record.heap_pushes += pops + len(heap)
+            record.lap("search")
+        return cost
+
+    def _buffered_dijkstra(self, buffers, source, targets, record=None):
+        """Dijkstra from source until all targets are settled, returns their costs"""
+        generation = buffers.next_generation()
+        gScore, cameFrom, stamp, closed = buffers.gScore, buffers.cameFrom, buffers.stamp, buffers.closed
+        gScore[source] = 0.0
+        cameFrom[source] = -1
+        stamp[source] = generation
+        remaining = set(targets)
+        roads, road_lengths = self.map.roads, self.map.road_lengths
+        heap = [(0.0, source)]
+        expanded = stale = relaxed = open_peak = 0
+        while heap and remaining:
+            g, current = heapq.heappop(heap)
+            if closed[current] == generation:
+                stale += 1
+                continue
+            closed[current] = generation
+            remaining.discard(current)
+            if record is not None:
+                expanded += 1
+                relaxed += len(roads[current])
+                open_peak = max(open_peak, len(heap) + 1)
+            for neighbor, length in zip(roads[current], road_lengths[current]):
+                if closed[neighbor] == generation:
+                    continue
+                tentative = g + length
+                if stamp[neighbor] == generation and tentative >= gScore[neighbor]:
+                    continue
+                gScore[neighbor] = tentative
+                cameFrom[neighbor] = current
+                stamp[neighbor] = generation
+                heapq.heappush(heap, (tentative, neighbor))
+        if record is not None:
+            record.expanded += expanded
+            record.relaxed += relaxed
+            record.open_peak = max(record.open_peak, open_peak)
+            record.heap_pops += expanded + stale
+            record.heap_pushes += expanded + stale + len(heap)
+            record.lap("search")
+        return [gScore[target] if closed[target] == generation else float('inf') for target in targets]
+
+    def estimate_between(self, node, target):
+        """Uncached heuristic estimate of the cost from node to target.
+
+        The straight-line distance is scaled by the map's heuristic_scale so it
+        stays a lower bound when road costs are not lengths, e.g. travel times."""
+        estimate = self.distance(node, target) * getattr(self.map, 'heuristic_scale', 1.0)
+        if self.heuristic is not None:
+            return max(estimate, self.heuristic.lower_bound(node, target))
+        return estimate
+
     def reconstruct_path(self, current):
         """ Reconstructs path after search """
         total_path = [current]
@@ -30,7 +386,8 @@ class PathPlanner():
         self.cameFrom = None
         self.gScore = None
         self.fScore = None
-        self.path = self.run_search() if self.map and self.start and self.goal else None
+        self.hScores = {}
+        self.path = self.run_search() if self.map and self.start != None and self.goal != None else None
     
     
     def run_search(self):
@@ -41,24 +398,61 @@ class PathPlanner():
             raise(ValueError, "Must create goal node before running search. Try running PathPlanner.set_goal(start_node)")
         if self.start == None:
             raise(ValueError, "Must create start node before running search. Try running PathPlanner.set_start(start_node)")
+        record = None
+        if self.stats is not None:
+            engine = "astar-bidirectional" if self.bidirectional else "astar-" + self.open_set
+            record = self.stats.begin(engine, self.start, self.goal)
+        if self.cache is not None:
+            cached = self.cache.get(self.map, self.start, self.goal)
+            if cached is not None:
+                self.path = cached[0]
+                if record is not None:
+                    record.engine = "cache"
+                    record.lap("cache")
+                    self.stats.end(record, cached[1])
+                if self.path is None:
+                    return False
+                return self.path
+            if record is not None:
+                record.lap("cache")
+        if self.components is not None and not self.components.connected(self.start, self.goal):
+            self.path = None
+            self._remember_path()
+            if record is not None:
+                record.lap("search")
+                self.stats.end(record, float('inf'))
+            return False
+        if self.bidirectional:
+            return self.run_bidirectional_search(record)
 
         self.closedSet = self.closedSet if self.closedSet != None else self.create_closedSet()
         self.openSet = self.openSet if self.openSet != None else  self.create_openSet()
         self.cameFrom = self.cameFrom if self.cameFrom != None else  self.create_cameFrom()
         self.gScore = self.gScore if self.gScore != None else  self.create_gScore()
         self.fScore = self.fScore if self.fScore != None else  self.create_fScore()
+        if record is not None:
+            record.lap("setup")
 
         while not self.is_open_empty():
             current = self.get_current_node()
 
             if current == self.goal:
+                if record is not None:
+                    record.lap("search")
                 self.path = [x for x in reversed(self.reconstruct_path(current))]
+                self._remember_path()
+                if record is not None:
+                    record.lap("path")
+                    self._end_record(record, self.get_gScore(current))
                 return self.path
             else:
                 self.openSet.remove(current)
                 self.closedSet.add(current)
+            if record is not None:
+                record.expanded += 1
+                record.relaxed += len(self.get_neighbors(current))
 
-            for neighbor in self.get_neighbors(current):
+            for neighbor, length in zip(self.get_neighbors(current), self.get_road_lengths(current)):
                 if neighbor in self.closedSet:
                     continue    # Ignore the neighbor which is already evaluated.
 
@@ -67,191 +461,623 @@ class PathPlanner():
                 
                 # The distance from start to a neighbor
                 #the "dist_between" function may vary as per the solution requirements.
-                if self.get_tentative_gScore(current, neighbor) >= self.get_gScore(neighbor):
+                tentative_gScore = self.get_tentative_gScore(current, neighbor, length)
+                if tentative_gScore >= self.get_gScore(neighbor):
                     continue        # This is not a better path.
 
                 # This path is the best until now. Record it!
-                self.record_best_path_to(current, neighbor)
-        print("No Path Found")
+                self.record_best_path_to(current, neighbor, tentative_gScore)
+            if record is not None:
+                record.open_peak = max(record.open_peak, len(self.openSet))
         self.path = None
+        self._remember_path()
+        if record is not None:
+            record.lap("search")
+            self._end_record(record, float('inf'))
         return False
 
+    def _end_record(self, record, cost):
+        """Complete the stats of a run_search query; heap counts come from the open set"""
+        if isinstance(self.openSet, HeapOpenSet):
+            record.heap_pushes = self.openSet.pushes
+            record.heap_pops = self.openSet.pops
+        self.stats.end(record, cost)
 
-def create_closedSet(self):
-    """ Creates and returns a data structure suitable to hold the set of nodes already evaluated"""
-    # EXAMPLE: return a data structure suitable to hold the set of nodes already evaluated
-    
-    return set()
-
-def create_openSet(self):
-    """ Creates and returns a data structure suitable to hold the set of currently discovered nodes 
-    that are not evaluated yet. Initially, only the start node is known."""
-    if self.start != None:
-        # TODO: return a data structure suitable to hold the set of currently discovered nodes 
-        # that are not evaluated yet. Make sure to include the start node.
-        OpenSet = set()
-        OpenSet.add(self.start)
-    
-    else:
-        
-        raise(ValueError, "Must create start node before creating an open set. Try running PathPlanner.set_start(start_node)")
-        
-    return OpenSet
-    
+    def run_bidirectional_search(self, record=None):
+        """Bidirectional A* between start and goal (NBA*, Pijls and Post).
 
-def create_cameFrom(self):
-    """Creates and returns a data structure that shows which node can most efficiently be reached from another,
-    for each node."""
-    # TODO: return a data structure that shows which node can most efficiently be reached from another,
-    # for each node. 
-    preceding_nodes = {}
-    
-    return preceding_nodes
-
-def create_gScore(self):
-    """Creates and returns a data structure that holds the cost of getting from the start node to that node, 
-    for each node. The cost of going from start to start is zero."""
-    # TODO:  return a data structure that holds the cost of getting from the start node to that node, for each node.
-    # for each node. The cost of going from start to start is zero. The rest of the node's values should 
-    # be set to infinity.
-    ###
-    ##
-    ###
-    gScore_at_node = {}
-    ###
-    ##
-    ###
-    for key in  self.map.intersections:
-        #======
-        gScore_at_node[key] = float('inf')
-
-    gScore_at_node[self.start] = 0.0
+        Each side is A* towards the other end: forward ranks nodes by
+        g + h(v, goal), reverse by g + h(v, start). The sides share one
+        closed set, so a node is expanded at most once, and a popped node is
+        dropped without expanding it when either bound shows it cannot lie on
+        a path cheaper than the best meeting found:
 
-    
-    return gScore_at_node
-
-def create_fScore(self):
-    """Creates and returns a data structure that holds the total cost of getting from the start node to the goal
-    by passing by that node, for each node. That value is partly known, partly heuristic.
-    For the first node, that value is completely heuristic."""
-    # TODO: return a data structure that holds the total cost of getting from the start node to the goal
-    # by passing by that node, for each node. That value is partly known, partly heuristic.
-    # For the first node, that value is completely heuristic. The rest of the node's value should be 
-    # set to infinity.
-    ###
-    ##-------- create fScores dictionary and a map_coord dictionary to hold current map.intersections
-    ###
-    fScores = {}
-    map_coord = self.map.intersections
-    ###
-    ##-------- initialize fScores data structure
-    ###
-    for key in  map_coord:
-        #==== set map's nodes fscores to infinity
-        fScores[key] = float('inf')
-    ##
-    ##----------except the start node whose fscore equals heuristic cost to goal
-    ##
-    fScores[self.start] = self.heuristic_cost_estimate(self.start);
-    
-    return fScores
-
-def set_map(self, M):
-    """Method used to set map attribute """
-    self._reset(self)
-    self.start = None
-    self.goal = None
-    # TODO: Set map to new value. 
-    self.map = M
-
-def set_start(self, start):
-    """Method used to set start attribute """
-    self._reset(self)
-    # TODO: Set start value. Remember to remove goal, closedSet, openSet, cameFrom, gScore, fScore, 
-    # and path attributes' values.
-    self.goal = none
-    self.start= start
-
-def set_goal(self, goal):
-    """Method used to set goal attribute """
-    self._reset(self)
-    # TODO: Set goal value. 
-    self.goal = goal
-
-def is_open_empty(self):
-    """returns True if the open set is empty. False otherwise. """
-    # TODO: Return True if the open set is empty. False otherwise.
-       
-    return self.openSet == set()
-
-def get_current_node(self):
-    """ Returns the node in the open set with the lowest value of f(node)."""
-    # TODO: Return the node in the open set with the lowest value of f(node).
-    ##
-    ##
-    ##
-    lowest_f = 1000.0 ##______initialize and store lowest fScore value here
-    ##
-    ##-------iterate through openSet nodes to determine the node 
-    ##-------with lowest fscore 
-    ##
-    for element in self.openSet:
-        
-        if self.fScore[element] < lowest_f:
-            
-            lowest_f = self.fScore[element] 
-            node = element  ## save the openset node
-
-    return node
-
-def get_neighbors(self, node):
-    """Returns the neighbors of a node"""
-    # TODO: Return the neighbors of a node
-    return self.map.roads[node]
-
-def get_gScore(self, node):
-    """Returns the g Score of a node"""
-    # TODO: Return the g Score of a node
-    
-    return self.gScore[node]
-
-
-def distance(self, node_1, node_2):
-    """ Computes the Euclidean L2 Distance"""
-    # TODO: Compute and return the Euclidean L2 Distance
-    #
-    #---------/// map_coord variable to hold current map intersections dictionary
-    #
-    map_coord = self.map.intersections;
-    #
-    #--------!!! return straight-line distance between 2 nodes 
-    #--------!!! for calculation, use X and Y coordinates at each node 
-    #
-    return math.sqrt((map_coord[node_2][0] - map_coord[node_1][0])**2 + (map_coord[node_2][1] - map_coord[node_1][1])**2)
-
-def get_tentative_gScore(self, current, neighbor):
-    """Returns the tentative g Score of a node"""
-    # TODO: Return the g Score of the current node 
-    # plus distance from the current node to it's neighbors
-    return self.get_gScore(current) + self.distance(current, neighbor)
-
-
-def heuristic_cost_estimate(self, node):
-    """ Returns the heuristic cost estimate of a node """
-    # TODO: Return the heuristic cost estimate of a node
-    return self.distance(node, self.goal)
-
-
-def calculate_fscore(self, node):
-    """Calculate the f score of a node. """
-    # TODO: Calculate and returns the f score of a node. 
-    # REMEMBER F = G + H
-    #           - G -            +             -H-
-    return self.get_gScore(node) + self.heuristic_cost_estimate(node)
-
-def record_best_path_to(self, current, neighbor):
-    """Record the best path to a node """
-    # TODO: Record the best path to a node, by updating cameFrom, gScore, and fScore
-    self.cameFrom[neighbor] = current
-    self.gScore[neighbor] = self.get_tentative_gScore(current, neighbor)
-    self.fScore[neighbor] = self.calculate_fscore(neighbor)  
+            g(v) + h(v, own target) >= best
+            g(v) + smallest key of the other side - h(v, other target) >= best
+
+        The search stops when either frontier runs empty or its smallest key
+        reaches the best cost."""
+        start, goal = self.start, self.goal
+        targets = (goal, start)
+        hScores = ({}, {})
+        def estimate(node, side):
+            h = hScores[side].get(node)
+            if h is None:
+                h = hScores[side][node] = self.estimate_between(node, targets[side])
+            return h
+        roads, road_lengths = self.map.roads, self.map.road_lengths
+
+        gScores = ({start: 0.0}, {goal: 0.0})
+        cameFroms = ({}, {})
+        closedSet = set()
+        heaps = ([(estimate(start, 0), start)], [(estimate(goal, 1), goal)])
+        best_cost = 0.0 if start == goal else float('inf')
+        meeting = start if start == goal else None
+
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] >= best_cost or heaps[1][0][0] >= best_cost:
+                break   # no unexplored meeting point can beat the best path
+            side = 0 if len(heaps[0]) <= len(heaps[1]) else 1   # expand the smaller frontier
+            if record is not None:
+                record.open_peak = max(record.open_peak, len(heaps[0]) + len(heaps[1]))
+                record.heap_pops += 1
+            _, current = heapq.heappop(heaps[side])
+            if current in closedSet:
+                continue
+            closedSet.add(current)
+            gScore, other_gScore = gScores[side], gScores[1 - side]
+            other_top = heaps[1 - side][0][0]
+            if (gScore[current] + estimate(current, side) >= best_cost or
+                    gScore[current] + other_top - estimate(current, 1 - side) >= best_cost):
+                continue    # pruned: no better path runs through current
+            neighbors = roads[current]
+            if record is not None:
+                record.expanded += 1
+                record.relaxed += len(neighbors)
+            for neighbor, length in zip(neighbors, road_lengths[current]):
+                if neighbor in closedSet:
+                    continue
+                tentative = gScore[current] + length
+                if tentative >= gScore.get(neighbor, float('inf')):
+                    continue
+                gScore[neighbor] = tentative
+                cameFroms[side][neighbor] = current
+                heapq.heappush(heaps[side], (tentative + estimate(neighbor, side), neighbor))
+                if neighbor in other_gScore and tentative + other_gScore[neighbor] < best_cost:
+                    best_cost = tentative + other_gScore[neighbor]
+                    meeting = neighbor
+
+        self.gScore, self.cameFrom = gScores[0], cameFroms[0]
+        self.closedSet = closedSet
+        if record is not None:
+            record.lap("search")
+            record.heap_pushes = record.heap_pops + len(heaps[0]) + len(heaps[1])
+        if meeting is None:
+            self.path = None
+            self._remember_path()
+            if record is not None:
+                self.stats.end(record, float('inf'))
+            return False
+        forward = [x for x in reversed(self.reconstruct_path(meeting))]
+        node = meeting
+        while node in cameFroms[1]:
+            node = cameFroms[1][node]
+            forward.append(node)
+        self.path = forward
+        self._remember_path()
+        if record is not None:
+            record.lap("path")
+            self.stats.end(record, best_cost)
+        return self.path
+
+    def anytime_search(self, deadline=None, epsilon=3.0, step=0.5):
+        """Anytime repairing A* (ARA*): a quick first path, improved while time remains.
+
+        The first pass is weighted A* with weight epsilon. Each further pass
+        lowers epsilon by step and repairs the previous search rather than
+        starting over: only nodes whose gScore improved since they were
+        expanded (kept aside as inconsistent) go back on the open set.
+
+        deadline is the time budget in seconds; once it has passed the best
+        path found so far is returned, but the search always runs until it
+        has a first path. Without a deadline it runs down to epsilon 1, the
+        optimal path. Returns the path, or False if the goal is unreachable.
+        Afterwards self.suboptimality is the proven bound on path cost /
+        optimal cost and self.solutions lists (seconds, cost, bound) for
+        every path found."""
+        if epsilon < 1.0:
+            raise ValueError("epsilon must be at least 1, got %r" % epsilon)
+        if step <= 0:
+            raise ValueError("step must be positive, got %r" % step)
+        started = time.perf_counter()
+        stop_at = started + deadline if deadline is not None else None
+        goal = self.goal
+        if self.components is not None and not self.components.connected(self.start, goal):
+            self.path = None
+            self.suboptimality = None
+            self.solutions = []
+            return False
+        self.closedSet = self.create_closedSet()
+        self.cameFrom = self.create_cameFrom()
+        self.gScore = self.create_gScore()
+        self.fScore = self.create_fScore()
+        self.openSet = HeapOpenSet()
+        self.fScore[self.start] = epsilon * self.heuristic_cost_estimate(self.start)
+        self.openSet.push(self.start, self.fScore[self.start])
+        inconsistent = set()
+        self.solutions = []
+        best_path, bound = None, float('inf')
+
+        while True:
+            if not self._improve_path(epsilon, inconsistent, stop_at if best_path is not None else None):
+                break   # out of time; the previous pass's path stands
+            cost = self.get_gScore(goal)
+            if cost == float('inf'):
+                self.path = None
+                self.suboptimality = None
+                return False
+            # every unexpanded node bounds the optimum from below by g + h
+            lower = min([self.get_gScore(node) + self.heuristic_cost_estimate(node)
+                         for node in itertools.chain(self.openSet, inconsistent)] or [cost])
+            bound = min(epsilon, cost / lower) if lower > 0 else 1.0
+            best_path = [x for x in reversed(self.reconstruct_path(goal))]
+            self.solutions.append((time.perf_counter() - started, cost, bound))
+            if epsilon <= 1.0 or bound <= 1.0 or (stop_at is not None and time.perf_counter() >= stop_at):
+                break
+            epsilon = max(1.0, epsilon - step)
+            for node in inconsistent:
+                self.openSet.add(node)
+            inconsistent = set()
+            for node in list(self.openSet):
+                self.fScore[node] = self.get_gScore(node) + epsilon * self.heuristic_cost_estimate(node)
+                self.openSet.push(node, self.fScore[node])
+            self.closedSet = self.create_closedSet()
+
+        self.path = best_path
+        self.suboptimality = bound
+        if bound <= 1.0:
+            self._remember_path()
+        return self.path
+
+    def _improve_path(self, epsilon, inconsistent, stop_at):
+        """One ARA* pass; returns False if it was cut short by stop_at"""
+        goal = self.goal
+        expanded = 0
+        while True:
+            current = self.openSet.peek_lowest(self.fScore)
+            if current is None or self.fScore[current] >= self.get_gScore(goal):
+                return True
+            self.openSet.pop_lowest(self.fScore)
+            self.openSet.remove(current)
+            self.closedSet.add(current)
+            expanded += 1
+            if stop_at is not None and expanded % 64 == 0 and time.perf_counter() >= stop_at:
+                return False
+            for neighbor, length in zip(self.get_neighbors(current), self.get_road_lengths(current)):
+                tentative_gScore = self.get_tentative_gScore(current, neighbor, length)
+                if tentative_gScore >= self.get_gScore(neighbor):
+                    continue
+                self.cameFrom[neighbor] = current
+                self.gScore[neighbor] = tentative_gScore
+                if neighbor in self.closedSet:
+                    inconsistent.add(neighbor)
+                else:
+                    self.fScore[neighbor] = tentative_gScore + epsilon * self.heuristic_cost_estimate(neighbor)
+                    self.openSet.push(neighbor, self.fScore[neighbor])
+
+    def _remember_path(self):
+        """Store the result of the last search in the route cache, if there is one"""
+        if self.cache is None or self.weight != 1.0:
+            return      # a weighted search's path is not necessarily the shortest
+        if not self.path:
+            self.cache.put(self.map, self.start, self.goal, None)
+            return
+        prefix_costs = [0.0]
+        for current, neighbor in zip(self.path, self.path[1:]):
+            prefix_costs.append(prefix_costs[-1] + self.get_road_length(current, neighbor))
+        self.cache.put(self.map, self.start, self.goal, self.path, prefix_costs)
+
+    def create_closedSet(self):
+        """ Creates and returns a data structure suitable to hold the set of nodes already evaluated"""
+        # EXAMPLE: return a data structure suitable to hold the set of nodes already evaluated
+
+        return set()
+
+    def create_openSet(self):
+        """ Creates and returns a data structure suitable to hold the set of currently discovered nodes 
+        that are not evaluated yet. Initially, only the start node is known."""
+        if self.start != None:
+            # TODO: return a data structure suitable to hold the set of currently discovered nodes 
+            # that are not evaluated yet. Make sure to include the start node.
+            if self.open_set == "heap":
+                OpenSet = HeapOpenSet()
+                OpenSet.push(self.start, self.heuristic_cost_estimate(self.start))
+            else:
+                OpenSet = set()
+                OpenSet.add(self.start)
+
+        else:
+
+            raise(ValueError, "Must create start node before creating an open set. "
+                              "Try running PathPlanner.set_start(start_node)")
+
+        return OpenSet
+
+    def create_cameFrom(self):
+        """Creates and returns a data structure that shows which node can most efficiently be reached from another,
+        for each node."""
+        # TODO: return a data structure that shows which node can most efficiently be reached from another,
+        # for each node. 
+        preceding_nodes = {}
+
+        return preceding_nodes
+
+    def create_gScore(self):
+        """Creates and returns a data structure that holds the cost of getting from the start node to that node, 
+        for each node. The cost of going from start to start is zero."""
+        # TODO:  return a data structure that holds the cost of getting from the start node to that node, for each node.
+        # for each node. The cost of going from start to start is zero. The rest of the node's values should 
+        # be set to infinity.
+        ###
+        ##
+        ###
+        gScore_at_node = {}
+        ###
+        ##
+        ###
+        for key in  self.map.intersections:
+            #======
+            gScore_at_node[key] = float('inf')
+
+        gScore_at_node[self.start] = 0.0
+
+        return gScore_at_node
+
+    def create_fScore(self):
+        """Creates and returns a data structure that holds the total cost of getting from the start node to the goal
+        by passing by that node, for each node. That value is partly known, partly heuristic.
+        For the first node, that value is completely heuristic."""
+        # TODO: return a data structure that holds the total cost of getting from the start node to the goal
+        # by passing by that node, for each node. That value is partly known, partly heuristic.
+        # For the first node, that value is completely heuristic. The rest of the node's value should be 
+        # set to infinity.
+        ###
+        ##-------- create fScores dictionary and a map_coord dictionary to hold current map.intersections
+        ###
+        fScores = {}
+        map_coord = self.map.intersections
+        ###
+        ##-------- initialize fScores data structure
+        ###
+        for key in  map_coord:
+            #==== set map's nodes fscores to infinity
+            fScores[key] = float('inf')
+        ##
+        ##----------except the start node whose fscore equals heuristic cost to goal
+        ##
+        fScores[self.start] = self.heuristic_cost_estimate(self.start);
+
+        return fScores
+
+    def set_map(self, M):
+        """Method used to set map attribute """
+        if self.bidirectional:
+            require_two_way(M, "bidirectional search")
+        if self.cache is not None and self.map is not None:
+            self.cache.invalidate(self.map)     # routes on the old map must not be served again
+        self.start = None
+        self.goal = None
+        # TODO: Set map to new value. 
+        self.map = M
+        self._reset()
+
+    def set_start(self, start):
+        """Method used to set start attribute """
+        # TODO: Set start value. Remember to remove goal, closedSet, openSet, cameFrom, gScore, fScore, 
+        # and path attributes' values.
+        self.goal = None
+        self.start= start
+        self._reset()
+
+    def set_goal(self, goal):
+        """Method used to set goal attribute """
+        # TODO: Set goal value. 
+        self.goal = goal
+        self._reset()
+
+    def is_open_empty(self):
+        """returns True if the open set is empty. False otherwise. """
+        # TODO: Return True if the open set is empty. False otherwise.
+
+        return len(self.openSet) == 0
+
+    def get_current_node(self):
+        """ Returns the node in the open set with the lowest value of f(node)."""
+        # TODO: Return the node in the open set with the lowest value of f(node).
+        if self.open_set == "heap":
+            return self.openSet.pop_lowest(self.fScore)
+        ##
+        ##
+        ##
+        lowest_f = float('inf') ##______initialize and store lowest fScore value here
+        node = next(iter(self.openSet)) ##______fallback when every fScore is infinite
+        ##
+        ##-------iterate through openSet nodes to determine the node 
+        ##-------with lowest fscore 
+        ##
+        for element in self.openSet:
+
+            if self.fScore[element] < lowest_f:
+
+                lowest_f = self.fScore[element] 
+                node = element  ## save the openset node
+
+        return node
+
+    def get_neighbors(self, node):
+        """Returns the neighbors of a node"""
+        # TODO: Return the neighbors of a node
+        return self.map.roads[node]
+
+    def get_road_lengths(self, node):
+        """Returns the costs of the roads leaving a node, in the same order as get_neighbors"""
+        return self.map.road_lengths[node]
+
+    def get_gScore(self, node):
+        """Returns the g Score of a node"""
+        # TODO: Return the g Score of a node
+
+        return self.gScore[node]
+
+    def distance(self, node_1, node_2):
+        """ Computes the Euclidean L2 Distance"""
+        # TODO: Compute and return the Euclidean L2 Distance
+        #
+        #---------/// map_coord variable to hold current map intersections dictionary
+        #
+        map_coord = self.map.intersections;
+        #
+        #--------!!! return straight-line distance between 2 nodes 
+        #--------!!! for calculation, use X and Y coordinates at each node 
+        #
+        return math.sqrt((map_coord[node_2][0] - map_coord[node_1][0])**2 +
+                         (map_coord[node_2][1] - map_coord[node_1][1])**2)
+
+    def get_road_length(self, current, neighbor):
+        """Returns the cost of the road from current to neighbor"""
+        return self.get_road_lengths(current)[list(self.get_neighbors(current)).index(neighbor)]
+
+    def get_tentative_gScore(self, current, neighbor, length=None):
+        """Returns the tentative g Score of a node, given the road length if it is already known"""
+        # TODO: Return the g Score of the current node 
+        # plus distance from the current node to it's neighbors
+        if length is None:
+            length = self.get_road_length(current, neighbor)
+        return self.get_gScore(current) + length
+
+    def heuristic_cost_estimate(self, node, target=None):
+        """ Returns the heuristic cost estimate of a node, towards the goal unless another target is given """
+        # TODO: Return the heuristic cost estimate of a node
+        target = self.goal if target is None else target
+        #
+        #--------!!! estimates are cached per target; bidirectional search needs
+        #--------!!! two targets (goal and start), anything beyond that starts over
+        #
+        cache = self.hScores.get(target)
+        if cache is None:
+            if len(self.hScores) >= 2:
+                self.hScores.clear()
+            cache = self.hScores[target] = {}
+        if node not in cache:
+            cache[node] = self.estimate_between(node, target)
+        return cache[node]
+
+    def calculate_fscore(self, node):
+        """Calculate the f score of a node, with the heuristic inflated by the planner's weight. """
+        # TODO: Calculate and returns the f score of a node. 
+        # REMEMBER F = G + H
+        #           - G -            +             -H-
+        return self.get_gScore(node) + self.weight * self.heuristic_cost_estimate(node)
+
+    def record_best_path_to(self, current, neighbor, tentative_gScore=None):
+        """Record the best path to a node """
+        # TODO: Record the best path to a node, by updating cameFrom, gScore, and fScore
+        self.cameFrom[neighbor] = current
+        if tentative_gScore is None:
+            tentative_gScore = self.get_tentative_gScore(current, neighbor)
+        self.gScore[neighbor] = tentative_gScore
+        self.fScore[neighbor] = self.calculate_fscore(neighbor)
+        if self.open_set == "heap":
+            self.openSet.push(neighbor, self.fScore[neighbor])
+
+
+class IncrementalPlanner(object):
+    """D* Lite planner that repairs its search when road costs change.
+
+    The search runs backwards from the goal, so gScore[node] is the cost from
+    node to the goal and cameFrom[node] the next node towards it; rhs holds
+    the one-step lookahead values. After update_edge or move_start, replan
+    only re-expands the nodes whose costs were affected, which for a vehicle
+    meeting a closed road is a small fraction of a full A* run.
+
+    planner is a PathPlanner used only to read the map's roads and the
+    heuristic; the search state is this object's own.
+
+    Roads stay two-way: an update applies to both directions. New costs may
+    go up (float('inf') closes the road) or down, but not below the
+    heuristic's straight-line estimate."""
+    def __init__(self, M, start, goal, heuristic=None, stats=None):
+        require_two_way(M, "IncrementalPlanner")
+        self.planner = PathPlanner(M, heuristic=heuristic)
+        self.start = start
+        self.goal = goal
+        self.stats = stats
+        self.costs = {}         # (node, neighbor) -> overridden road cost
+        self.expansions = 0     # nodes expanded by the last replan
+        self._initialize()
+        self.path = self.replan()
+
+    @property
+    def map(self):
+        return self.planner.map
+
+    def set_map(self, M):
+        """Switch to another map, forgetting the cost changes made on the old one, and plan from scratch"""
+        require_two_way(M, "IncrementalPlanner")
+        self.planner.set_map(M)
+        self.costs = {}
+        return self.run_search()
+
+    def set_goal(self, goal):
+        """Plan to another goal from scratch; cost changes are kept"""
+        self.goal = goal
+        return self.run_search()
+
+    def _initialize(self):
+        self.gScore = {}
+        self.rhs = {self.goal: 0.0}
+        self.cameFrom = {}
+        self.km = 0.0
+        self._last_start = self.start
+        self._queue = []
+        self._queued = {}       # node -> key of its live queue entry
+        self._push(self.goal)
+
+    def run_search(self):
+        """Discard all search state and plan from scratch"""
+        self._initialize()
+        return self.replan()
+
+    def cost(self, node, neighbor):
+        """Current cost of the road from node to neighbor"""
+        return self.costs.get((node, neighbor), self.planner.get_road_length(node, neighbor))
+
+    def _roads(self, node):
+        """(neighbor, current cost) pairs for the roads of node"""
+        costs = self.costs
+        for neighbor, length in zip(self.planner.get_neighbors(node), self.planner.get_road_lengths(node)):
+            yield neighbor, costs.get((node, neighbor), length)
+
+    def _key(self, node):
+        best = min(self.gScore.get(node, float('inf')), self.rhs.get(node, float('inf')))
+        return (best + self.planner.heuristic_cost_estimate(node, self.start) + self.km, best)
+
+    def _push(self, node):
+        key = self._key(node)
+        self._queued[node] = key
+        heapq.heappush(self._queue, (key, node))
+
+    def _top(self):
+        """Return (key, node) of the live queue entry with the smallest key, or None"""
+        queue = self._queue
+        while queue:
+            key, node = queue[0]
+            if self._queued.get(node) == key:
+                return key, node
+            heapq.heappop(queue)    # stale entry
+        return None
+
+    def _update_vertex(self, node):
+        consistent = self.gScore.get(node, float('inf')) == self.rhs.get(node, float('inf'))
+        if not consistent:
+            self._push(node)
+        elif node in self._queued:
+            del self._queued[node]
+
+    def _recompute_rhs(self, node):
+        """Set rhs[node] to the best one-step lookahead over its roads"""
+        best, best_neighbor = float('inf'), None
+        for neighbor, cost in self._roads(node):
+            candidate = cost + self.gScore.get(neighbor, float('inf'))
+            if candidate < best:
+                best, best_neighbor = candidate, neighbor
+        self.rhs[node] = best
+        if best_neighbor is None:
+            self.cameFrom.pop(node, None)
+        else:
+            self.cameFrom[node] = best_neighbor
+
+    def _compute_shortest_path(self):
+        gScore, rhs = self.gScore, self.rhs
+        self.expansions = 0
+        while True:
+            top = self._top()
+            start_rhs = rhs.get(self.start, float('inf'))
+            if top is None or (top[0] >= self._key(self.start) and start_rhs <= gScore.get(self.start, float('inf'))):
+                return
+            key, node = top
+            new_key = self._key(node)
+            if key < new_key:
+                self._push(node)    # key went stale because km changed
+                continue
+            heapq.heappop(self._queue)
+            del self._queued[node]
+            self.expansions += 1
+            g_old = gScore.get(node, float('inf'))
+            if g_old > rhs.get(node, float('inf')):
+                gScore[node] = rhs[node]
+                for neighbor, cost in self._roads(node):
+                    if neighbor != self.goal and cost + gScore[node] < rhs.get(neighbor, float('inf')):
+                        rhs[neighbor] = cost + gScore[node]
+                        self.cameFrom[neighbor] = node
+                        self._update_vertex(neighbor)
+            else:
+                # node got more expensive: every node that relied on it, and
+                # node itself, looks for a new best road
+                gScore[node] = float('inf')
+                for neighbor in [neighbor for neighbor, _ in self._roads(node)] + [node]:
+                    if neighbor != self.goal and (neighbor == node or self.cameFrom.get(neighbor) == node):
+                        self._recompute_rhs(neighbor)
+                    self._update_vertex(neighbor)
+
+    def replan(self):
+        """Bring the search up to date and return the path from start to goal, or False if there is none"""
+        record = self.stats.begin("dstar-lite", self.start, self.goal) if self.stats is not None else None
+        self._compute_shortest_path()
+        if record is not None:
+            record.expanded = self.expansions
+            record.lap("search")
+        # the start's g may still be overconsistent here; its rhs is the exact cost
+        if self.rhs.get(self.start, float('inf')) == float('inf'):
+            self.path = None
+            if record is not None:
+                self.stats.end(record, float('inf'))
+            return False
+        path = [self.start]
+        on_path = {self.start}
+        while path[-1] != self.goal:
+            node = path[-1]
+            best = min(self._roads(node), key=lambda road: road[1] + self.gScore.get(road[0], float('inf')))[0]
+            if best in on_path:
+                raise RuntimeError("D* Lite state is inconsistent: the path from %r returns to %r" % (self.start, best))
+            on_path.add(best)
+            self.cameFrom[node] = best
+            path.append(best)
+        self.path = path
+        if record is not None:
+            record.lap("path")
+            self.stats.end(record, self.rhs[self.start])
+        return self.path
+
+    def update_edge(self, node, neighbor, cost):
+        """Change the cost of the two-way road between node and neighbor; call replan afterwards"""
+        if neighbor not in self.planner.get_neighbors(node):
+            raise ValueError("there is no road between %r and %r" % (node, neighbor))
+        for u, v in ((node, neighbor), (neighbor, node)):
+            old_cost = self.cost(u, v)
+            self.costs[(u, v)] = cost
+            if u == self.goal:
+                continue
+            if cost < old_cost:
+                if cost + self.gScore.get(v, float('inf')) < self.rhs.get(u, float('inf')):
+                    self.rhs[u] = cost + self.gScore.get(v, float('inf'))
+                    self.cameFrom[u] = v
+            elif self.cameFrom.get(u) == v:
+                self._recompute_rhs(u)
+            self._update_vertex(u)
+
+    def move_start(self, start):
+        """Move the start, e.g. as the vehicle advances; call replan afterwards"""
+        self.km += self.planner.heuristic_cost_estimate(self._last_start, start)
+        self._last_start = start
+        self.start = start
@@ -0,0 +1,232 @@
+"""Top-k loopless alternative routes by Yen's algorithm.
+
+Yen's algorithm finds the k shortest loopless paths one at a time. The
+next path deviates from an accepted one at some spur node: it follows the
+accepted path (the root) up to the spur node, then takes the shortest
+route to the goal that avoids the root's nodes and the roads already used
+by accepted paths sharing that root. Done naively that is one full search
+per node of every accepted path.
+
+AlternativeRoutes shares the work between the spur searches through one
+reverse A* search from the goal towards the start, run on SearchBuffers
+like PathPlanner's and resumed as the routes get longer:
+
+  * Its closed nodes have their exact distance to the goal, and its
+    cameFrom entries form a shortest path tree towards the goal.
+  * Every other node v is at least F - hs(v) from the goal, for F the
+    smallest key left in its open set and hs its heuristic towards the
+    start. Together with the exact distances that is a consistent
+    heuristic for every spur search, since blocking roads and nodes only
+    makes routes longer.
+  * A spur search is A* guided by that heuristic. As soon as it takes a
+    node off its open set whose tree path to the goal avoids the blocked
+    roads and nodes, that tree path completes the spur path: its cost is
+    the node's key, the smallest in the open set. Most spur searches stop
+    after a handful of expansions this way.
+  * Lawler's rule: a path that deviated from its parent at position i only
+    spurs from position i onwards, the earlier spurs were all tried with
+    the parent.
+
+The reverse search is extended to the cost of each path before spurring
+from it, so it stays close to the ellipse A* explores for one query.
+
+    routes = AlternativeRoutes(M).search(start, goal, k=5)
+    for path, cost in routes:
+        ...
+"""
+import heapq
+import importlib
+
+from compact_map import require_two_way
+
+_astar = importlib.import_module("a-star")
+PathPlanner = _astar.PathPlanner
+SearchBuffers = _astar.SearchBuffers
+
+
+class AlternativeRoutes(object):
+    """k shortest loopless routes between two intersections.
+
+    planner is the PathPlanner whose heuristic and search buffers are
+    reused; by default a plain one is made for M. After a search,
+    spur_searches counts the spur searches, spur_expanded the nodes they
+    expanded and reverse_expanded the nodes the reverse search closed."""
+    def __init__(self, M, planner=None):
+        require_two_way(M, "AlternativeRoutes")
+        self.map = M
+        self.planner = planner if planner is not None else PathPlanner(M)
+        self.spur_searches = 0
+        self.spur_expanded = 0
+        self.reverse_expanded = 0
+
+    def search(self, start, goal, k=5):
+        """Return up to k loopless routes as (path, cost) pairs, cheapest first"""
+        if k < 1:
+            raise ValueError("k must be at least 1, got %r" % k)
+        self.spur_searches = self.spur_expanded = self.reverse_expanded = 0
+        if self.planner.components is not None and not self.planner.components.connected(start, goal):
+            return []
+        n = len(self.map.intersections)
+        reverse = getattr(self, '_reverse', None)
+        if reverse is None or reverse.size != n:
+            reverse = self._reverse = SearchBuffers(n)
+            self._blocked = bytearray(n)
+        self._begin_reverse(goal, start)
+        if not self._extend_reverse(float('inf'), start):
+            return []
+        first = self._tree_path(start, goal)
+        accepted = [(first, reverse.gScore[start], 0)]
+        candidates = []         # (cost, tie breaker, path, deviation index)
+        seen = {tuple(first)}
+        blocked = self._blocked
+        while len(accepted) < k:
+            path, cost, deviation = accepted[-1]
+            self._extend_reverse(cost)
+            # accepted paths sharing the first i + 1 nodes of path block the road they take next
+            shared = [(self._common_prefix(path, other), other) for other, _, _ in accepted]
+            root_cost = 0.0
+            for i in range(deviation):
+                root_cost += self._road_length(path[i], path[i + 1])
+                blocked[path[i]] = 1
+            for i in range(deviation, len(path) - 1):
+                spur = path[i]
+                blocked_roads = set(other[i + 1] for common, other in shared if common > i)
+                spur_path, spur_cost = self._spur(spur, goal, blocked_roads)
+                if spur_path is not None:
+                    candidate = path[:i] + spur_path
+                    key = tuple(candidate)
+                    if key not in seen:
+                        seen.add(key)
+                        heapq.heappush(candidates, (root_cost + spur_cost, len(seen), candidate, i))
+                root_cost += self._road_length(spur, path[i + 1])
+                blocked[spur] = 1
+            for node in path:
+                blocked[node] = 0
+            if not candidates:
+                break
+            cost, _, path, deviation = heapq.heappop(candidates)
+            accepted.append((path, cost, deviation))
+        return [(path, cost) for path, cost, _ in accepted]
+
+    @staticmethod
+    def _common_prefix(path, other):
+        common = 0
+        for a, b in zip(path, other):
+            if a != b:
+                break
+            common += 1
+        return common
+
+    def _road_length(self, node, con_node):
+        return min(length for other, length in zip(self.map.roads[node], self.map.road_lengths[node])
+                   if other == con_node)
+
+    def _begin_reverse(self, goal, start):
+        """Start the reverse A* search from goal towards start"""
+        reverse = self._reverse
+        self._generation = generation = reverse.next_generation()
+        self._start = start
+        reverse.gScore[goal] = 0.0
+        reverse.cameFrom[goal] = -1
+        reverse.stamp[goal] = generation
+        self._open = [(self.planner.estimate_between(goal, start), goal)]
+
+    def _extend_reverse(self, bound, target=None):
+        """Close reverse search nodes until the smallest open key exceeds bound
+        or target is closed; returns False if the open set ran out first"""
+        reverse, generation, start, heap = self._reverse, self._generation, self._start, self._open
+        gScore, cameFrom, stamp, closed = reverse.gScore, reverse.cameFrom, reverse.stamp, reverse.closed
+        hScore, hStamp = reverse.hScore, reverse.hStamp
+        roads, road_lengths = self.map.roads, self.map.road_lengths
+        estimate_between = self.planner.estimate_between
+        while heap and heap[0][0] <= bound:
+            f, current = heapq.heappop(heap)
+            if closed[current] == generation:
+                continue    # stale entry
+            closed[current] = generation
+            self.reverse_expanded += 1
+            g = gScore[current]
+            for neighbor, length in zip(roads[current], road_lengths[current]):
+                if closed[neighbor] == generation:
+                    continue
+                tentative = g + length
+                if stamp[neighbor] == generation and tentative >= gScore[neighbor]:
+                    continue
+                gScore[neighbor] = tentative
+                cameFrom[neighbor] = current
+                stamp[neighbor] = generation
+                if hStamp[neighbor] != generation:
+                    hScore[neighbor] = estimate_between(neighbor, start)
+                    hStamp[neighbor] = generation
+                heapq.heappush(heap, (tentative + hScore[neighbor], neighbor))
+            if current == target:
+                return True
+        return bool(heap)
+
+    def _tree_path(self, node, goal):
+        """Path from a closed node to the goal along the reverse search tree"""
+        cameFrom = self._reverse.cameFrom
+        path = [node]
+        while node != goal:
+            node = cameFrom[node]
+            path.append(node)
+        return path
+
+    def _spur(self, spur, goal, blocked_roads):
+        """Shortest path from spur to goal avoiding the blocked nodes and the
+        roads from spur to blocked_roads; returns (path, cost) or (None, inf)"""
+        reverse, generation, blocked = self._reverse, self._generation, self._blocked
+        exact, tree, done = reverse.gScore, reverse.cameFrom, reverse.closed
+        # lower bound for nodes the reverse search has not closed
+        frontier = self._open[0][0] if self._open else float('inf')
+        reverse_h, reverse_h_stamp = reverse.hScore, reverse.hStamp
+        estimate_between, start = self.planner.estimate_between, self._start
+
+        def h(node):
+            if done[node] == generation:
+                return exact[node]
+            if reverse_h_stamp[node] != generation:
+                reverse_h[node] = estimate_between(node, start)
+                reverse_h_stamp[node] = generation
+            return max(0.0, frontier - reverse_h[node])
+
+        buffers = self.planner._search_buffers()
+        spur_generation = buffers.next_generation()
+        gScore, cameFrom, stamp, closed = buffers.gScore, buffers.cameFrom, buffers.stamp, buffers.closed
+        roads, road_lengths = self.map.roads, self.map.road_lengths
+        self.spur_searches += 1
+        gScore[spur] = 0.0
+        cameFrom[spur] = -1
+        stamp[spur] = spur_generation
+        heap = [(h(spur), spur)]
+        while heap:
+            f, current = heapq.heappop(heap)
+            if closed[current] == spur_generation:
+                continue    # stale entry
+            closed[current] = spur_generation
+            if current == goal:
+                return buffers.path_to(goal), gScore[goal]
+            # f is the smallest key, so if the reverse tree path from current
+            # avoids the blocks and this search's closed nodes, which include
+            # the path to current, following it costs f and is the answer
+            if done[current] == generation and (current != spur or tree[spur] not in blocked_roads):
+                node = tree[current]
+                while node != goal and not blocked[node] and closed[node] != spur_generation:
+                    node = tree[node]
+                if node == goal:
+                    return buffers.path_to(current)[:-1] + self._tree_path(current, goal), f
+            self.spur_expanded += 1
+            g = gScore[current]
+            for neighbor, length in zip(roads[current], road_lengths[current]):
+                if closed[neighbor] == spur_generation or blocked[neighbor]:
+                    continue
+                if current == spur and neighbor in blocked_roads:
+                    continue
+                tentative = g + length
+                if stamp[neighbor] == spur_generation and tentative >= gScore[neighbor]:
+                    continue
+                gScore[neighbor] = tentative
+                cameFrom[neighbor] = current
+                stamp[neighbor] = spur_generation
+                heapq.heappush(heap, (tentative + h(neighbor), neighbor))
+        return None, float('inf')
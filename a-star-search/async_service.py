@@ -0,0 +1,206 @@
+"""Asyncio front end for path search.
+
+AsyncRouter lets an asyncio service await routes without blocking its event
+loop; the searches run in a pool of worker processes set up by
+query_server.init_worker, which memory-map the saved map file.
+
+    router = AsyncRouter("city.map", workers=4)
+    path, cost = await router.route(2, 15, timeout=0.5)
+
+Identical requests that are in flight at the same time share one search.
+Each caller has its own timeout; when the last caller waiting on a search
+times out or is cancelled, the search itself is stopped: every running
+search owns a slot in a shared flag array that the worker polls between
+expansions. At most max_in_flight searches run at once, further requests
+queue for a slot; metrics() reports the queue depth and counters.
+
+Running this module starts LoadTestClient, a local stand-in client that
+fires random queries at a router and prints latency percentiles:
+
+    python async_service.py city.map --requests 2000 --concurrency 64
+"""
+import argparse
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import random
+import time
+
+from compact_map import CompactMap
+from query_server import init_worker, run_cancellable
+
+
+class _Flight(object):
+    """A search in progress and the number of callers waiting for it"""
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncRouter(object):
+    """Awaitable route queries backed by a process pool"""
+    def __init__(self, map_file, workers=None, timeout=None, max_in_flight=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight or 4 * self.workers
+        self._flags = multiprocessing.Array('b', self.max_in_flight, lock=False)
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                         initargs=(map_file, self._flags))
+        self._free_slots = list(range(self.max_in_flight))
+        self._slot_gate = None      # semaphore counting free slots, made on the running loop
+        self._flights = {}
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.coalesced = 0
+        self.timeouts = 0
+        self.cancelled = 0
+
+    async def route(self, start, goal, timeout=None):
+        """Return (path, cost) from start to goal; path is None if goal is unreachable.
+
+        Raises asyncio.TimeoutError after timeout seconds (default: the
+        router's timeout)."""
+        key = (start, goal)
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight(asyncio.ensure_future(self._search(key)))
+        else:
+            self.coalesced += 1
+        flight.waiters += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(flight.task), timeout if timeout is not None else self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # nobody is waiting any more: stop the search, and let a new
+                # request for the same route start afresh
+                del self._flights[key]
+                flight.task.cancel()
+
+    async def _search(self, key):
+        try:
+            return await self._run_in_slot(key)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            flight = self._flights.get(key)
+            if flight is not None and flight.task is asyncio.current_task():
+                del self._flights[key]
+
+    async def _run_in_slot(self, key):
+        loop = asyncio.get_running_loop()
+        if self._slot_gate is None:
+            self._slot_gate = asyncio.Semaphore(self.max_in_flight)
+        self.queued += 1
+        try:
+            await self._slot_gate.acquire()
+        finally:
+            self.queued -= 1
+        slot = self._free_slots.pop()
+        self._flags[slot] = 0
+        self.running += 1
+        future = self._pool.submit(run_cancellable, key[0], key[1], slot)
+        # the slot is only reusable once the worker has really let go of it
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release, slot))
+        try:
+            result = await asyncio.wrap_future(future)
+            self.completed += 1
+            return result
+        except asyncio.CancelledError:
+            self._flags[slot] = 1
+            raise
+        finally:
+            self.running -= 1
+
+    def _release(self, slot):
+        self._free_slots.append(slot)
+        self._slot_gate.release()
+
+    def metrics(self):
+        """Return queue depth, searches running and counters as a dict"""
+        return {'queue_depth': self.queued, 'running': self.running, 'completed': self.completed,
+                'coalesced': self.coalesced, 'timeouts': self.timeouts, 'cancelled': self.cancelled}
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+
+class LoadTestClient(object):
+    """Local stand-in client that fires concurrent random queries at an AsyncRouter"""
+    def __init__(self, router, num_nodes, seed=0, hot_pairs=None):
+        self.router = router
+        self.num_nodes = num_nodes
+        self.rng = random.Random(seed)
+        # a small pool of repeated pairs mimics popular origin/destination traffic
+        self.hot_pairs = [self._random_pair() for _ in range(hot_pairs or 0)]
+
+    def _random_pair(self):
+        return self.rng.randrange(self.num_nodes), self.rng.randrange(self.num_nodes)
+
+    async def run(self, requests, concurrency, timeout=None):
+        """Send requests queries, at most concurrency at a time; returns a summary dict"""
+        latencies = []
+        errors = {'timeout': 0, 'other': 0}
+        gate = asyncio.Semaphore(concurrency)
+
+        async def one():
+            pair = self.rng.choice(self.hot_pairs) if self.hot_pairs and self.rng.random() < 0.5 else self._random_pair()
+            async with gate:
+                started = time.perf_counter()
+                try:
+                    await self.router.route(pair[0], pair[1], timeout=timeout)
+                except asyncio.TimeoutError:
+                    errors['timeout'] += 1
+                    return
+                except Exception:
+                    errors['other'] += 1
+                    return
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[one() for _ in range(requests)])
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(p / 100.0 * len(latencies)))] if latencies else float('nan')
+        return {'requests': requests, 'elapsed': elapsed, 'throughput': len(latencies) / elapsed,
+                'p50': percentile(50), 'p95': percentile(95), 'p99': percentile(99),
+                'errors': errors, 'router': self.router.metrics()}
+
+
+async def _main(args):
+    with CompactMap.open(args.map_file) as M:
+        num_nodes = M.num_nodes
+    async with AsyncRouter(args.map_file, workers=args.workers) as router:
+        client = LoadTestClient(router, num_nodes, seed=args.seed, hot_pairs=args.hot_pairs)
+        summary = await client.run(args.requests, args.concurrency, timeout=args.timeout)
+    print("%(requests)d requests in %(elapsed).2fs, %(throughput).1f routes/s" % summary)
+    print("latency p50 %.2f ms, p95 %.2f ms, p99 %.2f ms" % (summary['p50'] * 1e3, summary['p95'] * 1e3, summary['p99'] * 1e3))
+    print("errors %s" % summary['errors'])
+    print("router %s" % summary['router'])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test an AsyncRouter with a local client")
+    parser.add_argument("map_file")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--timeout", type=float, default=None)
+    parser.add_argument("--hot-pairs", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,267 @@
+"""Benchmark suite for the search engines on synthetic road graphs.
+
+Generates seeded graphs in the load_map_graph dictionary format:
+
+    geometric   uniform random intersections, each linked to its nearest
+                neighbours, like an unplanned road network
+    grid        a jittered street grid with a share of its blocks closed,
+                which forces detours the straight-line heuristic misjudges
+
+and runs one fixed, seeded query workload per graph through every selected
+engine. Per engine it reports preprocessing time, throughput, latency
+percentiles, mean expansions (for the PathPlanner based engines) and the
+peak memory allocated while answering queries, measured with tracemalloc on
+a separate pass so it does not slow down the timed one. Costs are checked
+against the first engine listed, plain A* by default.
+
+Results are written as JSON; pass an earlier results file with --compare to
+flag engines whose throughput or p50 latency got worse than --tolerance:
+
+    python benchmark.py --sizes 1000 10000 100000 --output before.json
+    python benchmark.py --sizes 1000 10000 100000 --compare before.json
+
+Graphs of 10**6 nodes work but take minutes to generate and need a few GB
+of memory, as the dictionary format is not compact.
+"""
+import argparse
+import datetime
+import importlib
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from compact_map import CompactMap
+from contraction import ContractionHierarchy
+from landmarks import LandmarkTable
+from search_stats import SearchStats
+from vector_search import VectorPlanner, np
+
+PathPlanner = importlib.import_module("a-star").PathPlanner
+
+GRAPHS = ("geometric", "grid")
+RESULT_FORMAT = 1
+
+
+def geometric_map_dict(n, seed=0, neighbours=3):
+    """Random geometric map: every node links to its nearest neighbours (average degree ~ 2 * neighbours)"""
+    rng = random.Random(seed)
+    positions = [(rng.random(), rng.random()) for _ in range(n)]
+    # bucket the nodes in a grid of about two nodes per cell so a node's
+    # candidates come from its own and the surrounding cells only
+    side = max(1, int(math.sqrt(n / 2.0)))
+    cells = {}
+    for node, (x, y) in enumerate(positions):
+        cells.setdefault((min(side - 1, int(x * side)), min(side - 1, int(y * side))), []).append(node)
+    map_dict = {}
+    for node, (x, y) in enumerate(positions):
+        cx, cy = min(side - 1, int(x * side)), min(side - 1, int(y * side))
+        candidates = [other for i in range(cx - 2, cx + 3) for j in range(cy - 2, cy + 3)
+                      for other in cells.get((i, j), ()) if other != node]
+        candidates.sort(key=lambda other: (positions[other][0] - x)**2 + (positions[other][1] - y)**2)
+        map_dict[node] = {'pos': (x, y), 'connections': candidates[:neighbours]}
+    return map_dict
+
+
+def grid_map_dict(n, seed=0, closed=0.1, jitter=0.3):
+    """Jittered street grid of n intersections with a fraction closed of the blocks removed"""
+    rng = random.Random(seed)
+    side = max(1, int(math.ceil(math.sqrt(n))))
+    map_dict = {}
+    for node in range(n):
+        row, column = divmod(node, side)
+        x = (column + 0.5 + rng.uniform(-jitter, jitter) / 2) / side
+        y = (row + 0.5 + rng.uniform(-jitter, jitter) / 2) / side
+        connections = []
+        if column + 1 < side and node + 1 < n and rng.random() >= closed:
+            connections.append(node + 1)
+        if node + side < n and rng.random() >= closed:
+            connections.append(node + side)
+        map_dict[node] = {'pos': (x, y), 'connections': connections}
+    return map_dict
+
+
+def make_map(graph, n, seed):
+    generator = geometric_map_dict if graph == "geometric" else grid_map_dict
+    return CompactMap.from_map_dict(generator(n, seed))
+
+
+def make_workload(n, queries, seed):
+    rng = random.Random(seed)
+    return [(rng.randrange(n), rng.randrange(n)) for _ in range(queries)]
+
+
+# Every engine factory takes the map and returns (query, stats): query(start,
+# goal) returns the route cost, stats is a SearchStats filled by the queries
+# or None when the engine cannot count its expansions.
+
+def _astar_engine(M):
+    stats = SearchStats(history=1)
+    planner = PathPlanner(M, stats=stats)
+    return lambda start, goal: planner.search_many([(start, goal)])[1][0], stats
+
+
+def _alt_engine(M):
+    stats = SearchStats(history=1)
+    planner = PathPlanner(M, heuristic=LandmarkTable.build(M, count=8), stats=stats)
+    return lambda start, goal: planner.search_many([(start, goal)])[1][0], stats
+
+
+def _bidirectional_engine(M):
+    stats = SearchStats(history=1)
+    planner = PathPlanner(M, bidirectional=True, stats=stats)
+    def query(start, goal):
+        planner.set_start(start)
+        planner.set_goal(goal)
+        return stats.queries[-1].cost
+    return query, stats
+
+
+def _ch_engine(M):
+    hierarchy = ContractionHierarchy.build(M)
+    return lambda start, goal: hierarchy.query(start, goal)[1], None
+
+
+def _vector_engine(M):
+    planner = VectorPlanner(M)
+    return lambda start, goal: planner.search(start, goal)[1], None
+
+
+ENGINES = {'astar': _astar_engine, 'alt': _alt_engine, 'bidirectional': _bidirectional_engine,
+           'ch': _ch_engine, 'numpy': _vector_engine}
+DEFAULT_ENGINES = ("astar", "alt", "bidirectional") + (("numpy",) if np is not None else ())
+
+
+def percentile(values, p):
+    """p-th percentile of sorted values by the nearest-rank method"""
+    if not values:
+        return float('nan')
+    return values[min(len(values) - 1, max(0, int(math.ceil(p / 100.0 * len(values))) - 1))]
+
+
+def run_engine(name, M, pairs, memory_queries):
+    """Benchmark one engine on M; returns (result dict, costs)"""
+    started = time.perf_counter()
+    query, stats = ENGINES[name](M)
+    build_seconds = time.perf_counter() - started
+    latencies = []
+    costs = []
+    started = time.perf_counter()
+    for start, goal in pairs:
+        began = time.perf_counter()
+        costs.append(query(start, goal))
+        latencies.append(time.perf_counter() - began)
+    elapsed = time.perf_counter() - started
+    expansions = stats.totals["expanded"] / float(stats.count) if stats is not None and stats.count else None
+
+    tracemalloc.start()
+    for start, goal in pairs[:memory_queries]:
+        query(start, goal)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {'engine': name, 'build_seconds': build_seconds, 'queries': len(pairs),
+            'throughput': len(pairs) / elapsed if elapsed else float('inf'),
+            'mean_ms': 1e3 * elapsed / len(pairs), 'p50_ms': 1e3 * percentile(latencies, 50),
+            'p90_ms': 1e3 * percentile(latencies, 90), 'p99_ms': 1e3 * percentile(latencies, 99),
+            'max_ms': 1e3 * latencies[-1], 'mean_expansions': expansions,
+            'query_peak_bytes': peak}, costs
+
+
+def run_suite(graphs, sizes, engines, queries, seed, memory_queries=20, log=None):
+    """Run every engine on every graph and size; returns a list of result dicts"""
+    results = []
+    for graph in graphs:
+        for n in sizes:
+            started = time.perf_counter()
+            M = make_map(graph, n, seed)
+            generate_seconds = time.perf_counter() - started
+            pairs = make_workload(n, queries, seed)
+            reference = None
+            for name in engines:
+                result, costs = run_engine(name, M, pairs, memory_queries)
+                if reference is None:
+                    reference = costs
+                result.update(graph=graph, nodes=n, edges=M.num_edges, map_bytes=M.nbytes,
+                              generate_seconds=generate_seconds, seed=seed,
+                              unreachable=sum(cost == float('inf') for cost in costs),
+                              mismatches=sum(not _same_cost(a, b) for a, b in zip(costs, reference)))
+                results.append(result)
+                if log is not None:
+                    log(result)
+    return results
+
+
+def _same_cost(a, b):
+    return a == b or abs(a - b) <= 1e-9 * max(1.0, abs(a), abs(b))
+
+
+def compare(results, baseline, tolerance):
+    """Return (key, metric, old, new) for every result that got worse than baseline by more than tolerance"""
+    previous = {(r['graph'], r['nodes'], r['engine']): r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        old = previous.get((result['graph'], result['nodes'], result['engine']))
+        if old is None:
+            continue
+        key = (result['graph'], result['nodes'], result['engine'])
+        if result['throughput'] < old['throughput'] * (1 - tolerance):
+            regressions.append((key, 'throughput', old['throughput'], result['throughput']))
+        if result['p50_ms'] > old['p50_ms'] * (1 + tolerance):
+            regressions.append((key, 'p50_ms', old['p50_ms'], result['p50_ms']))
+        if result['mismatches'] > old.get('mismatches', 0):
+            regressions.append((key, 'mismatches', old.get('mismatches', 0), result['mismatches']))
+    return regressions
+
+
+def _print_result(result):
+    expansions = "%.0f" % result['mean_expansions'] if result['mean_expansions'] is not None else "-"
+    print("%-9s %8d %-13s %8.1f q/s  p50 %8.3f  p90 %8.3f  p99 %8.3f ms  exp %8s  mem %8.1f KiB%s" % (
+        result['graph'], result['nodes'], result['engine'], result['throughput'], result['p50_ms'],
+        result['p90_ms'], result['p99_ms'], expansions, result['query_peak_bytes'] / 1024.0,
+        "  %d MISMATCHES" % result['mismatches'] if result['mismatches'] else ""))
+    sys.stdout.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the search engines on synthetic road graphs")
+    parser.add_argument("--graphs", nargs="+", choices=GRAPHS, default=list(GRAPHS))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--engines", nargs="+", choices=sorted(ENGINES), default=list(DEFAULT_ENGINES))
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--memory-queries", type=int, default=20,
+                        help="queries rerun under tracemalloc to measure memory")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="results JSON of an earlier run to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="relative slowdown tolerated before a result counts as a regression")
+    args = parser.parse_args()
+    if "numpy" in args.engines and np is None:
+        parser.error("the numpy engine requires numpy")
+
+    results = run_suite(args.graphs, args.sizes, args.engines, args.queries, args.seed,
+                        args.memory_queries, log=_print_result)
+    report = {'format': RESULT_FORMAT, 'created': datetime.datetime.now().isoformat(),
+              'python': platform.python_version(), 'platform': platform.platform(),
+              'args': vars(args), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for (graph, n, engine), metric, old, new in regressions:
+            print("REGRESSION %s %d %s: %s %.4g -> %.4g" % (graph, n, engine, metric, old, new))
+        if regressions:
+            sys.exit(1)
+        print("no regressions against %s" % args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Compare VectorPlanner with the scalar PathPlanner batch search by node degree.
+
+Builds seeded random maps of increasing average degree, runs the same
+queries through both engines and reports the mean time per query and the
+degree from which the NumPy engine wins.
+
+    python benchmark_vector.py --nodes 20000 --queries 50
+"""
+import argparse
+import importlib
+import random
+import time
+
+from compact_map import CompactMap
+from vector_search import VectorPlanner
+
+PathPlanner = importlib.import_module("a-star").PathPlanner
+
+
+def random_map_dict(n, degree, seed):
+    """Random geometric map where every node links to nearby nodes, average degree ~ degree"""
+    rng = random.Random(seed)
+    positions = sorted((rng.random(), rng.random()) for _ in range(n))
+    map_dict = {node: {'pos': pos, 'connections': []} for node, pos in enumerate(positions)}
+    window = 2 * degree
+    for node in range(n):
+        candidates = range(node + 1, min(n, node + 1 + window))
+        for con_node in rng.sample(candidates, min(len(candidates), max(1, degree // 2))):
+            map_dict[node]['connections'].append(con_node)
+    return map_dict
+
+
+def time_queries(engine, pairs):
+    started = time.perf_counter()
+    _, costs = engine.search_many(pairs)
+    return (time.perf_counter() - started) / len(pairs), costs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--degrees", type=int, nargs="+", default=[2, 4, 8, 16, 32, 64, 128])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    crossover = None
+    print("%8s %14s %14s %8s" % ("degree", "scalar ms/q", "numpy ms/q", "speedup"))
+    for degree in args.degrees:
+        M = CompactMap.from_map_dict(random_map_dict(args.nodes, degree, args.seed))
+        rng = random.Random(args.seed)
+        pairs = [(rng.randrange(args.nodes), rng.randrange(args.nodes)) for _ in range(args.queries)]
+        scalar, scalar_costs = time_queries(PathPlanner(M), pairs)
+        vector, vector_costs = time_queries(VectorPlanner(M), pairs)
+        if any(abs(a - b) > 1e-9 for a, b in zip(scalar_costs, vector_costs) if a != b):
+            raise AssertionError("engines disagree at degree %d" % degree)
+        print("%8.1f %14.3f %14.3f %8.2f" % (M.num_edges / float(M.num_nodes), scalar * 1e3, vector * 1e3, scalar / vector))
+        if crossover is None and vector < scalar:
+            crossover = M.num_edges / float(M.num_nodes)
+    if crossover is None:
+        print("scalar search was faster at every degree tested")
+    else:
+        print("numpy engine is faster from an average degree of about %.1f" % crossover)
+
+
+if __name__ == "__main__":
+    main()
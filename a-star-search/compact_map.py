@@ -0,0 +1,347 @@
+"""Compact compressed-sparse-row (CSR) map representation.
+
+CompactMap keeps a road network in a few flat arrays instead of a networkx
+graph, a dict of intersections and a list of lists of roads:
+
+    xs, ys      node coordinates
+    offsets     roads of node i are neighbors[offsets[i]:offsets[i + 1]]
+    neighbors   neighbor node ids, grouped by node
+    lengths     precomputed cost of every road, parallel to neighbors
+
+It exposes the same intersections and roads interface as helpers.Map, so a
+PathPlanner can search it directly without networkx.
+
+Maps are saved in a versioned binary file: a header, a section table and the
+flat arrays, each 8-byte aligned. CompactMap.open memory-maps such a file and
+reads the arrays in place, so worker processes opening the same file share
+one page-cache copy and start without deserialising anything.
+
+    header      magic b"PSMAP", format version, number of sections
+    section     name, array typecode, byte offset, item count (one per array)
+    data        the arrays, little-endian
+"""
+from array import array
+import math
+import mmap
+import struct
+import sys
+
+MAGIC = b"PSMAP\x00\x00\x00"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sII")
+_SECTION = struct.Struct("<16sc7xQQ")
+_ALIGN = 8
+_CORE_SECTIONS = ("xs", "ys", "offsets", "neighbors", "lengths")
+
+
+def layout_sections(specs):
+    """Lay out a map file for the given (name, typecode, count) specs.
+
+    Returns the header bytes, the byte offset of each section and the total
+    file size, so callers can write the arrays themselves, e.g. into a
+    preallocated mmap."""
+    header_size = _HEADER.size + _SECTION.size * len(specs)
+    position = _align(header_size)
+    table = []
+    offsets = []
+    for name, typecode, count in specs:
+        encoded = name.encode("ascii")
+        if len(encoded) > 16:
+            raise ValueError("section name %r is longer than 16 bytes" % name)
+        table.append(_SECTION.pack(encoded, typecode.encode("ascii"), position, count))
+        offsets.append(position)
+        position = _align(position + count * array(typecode).itemsize)
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, len(specs)) + b"".join(table)
+    return header, offsets, position
+
+
+def write_sections(filename, sections):
+    """Write (name, array) sections to a map file"""
+    _check_byteorder()
+    specs = [(name, _typecode(values), len(values)) for name, values in sections]
+    header, offsets, size = layout_sections(specs)
+    with open(filename, 'wb') as f:
+        f.write(header)
+        for (name, values), offset in zip(sections, offsets):
+            f.write(b"\x00" * (offset - f.tell()))
+            f.write(memoryview(values).cast('B'))
+        f.write(b"\x00" * (size - f.tell()))
+
+
+def shrink_section(buffer, index, count):
+    """Cut section number index of a map file held in a writable buffer down to count items.
+
+    The section keeps its place in the file; the freed tail becomes padding."""
+    position = _HEADER.size + index * _SECTION.size
+    name, typecode, offset, length = _SECTION.unpack_from(buffer, position)
+    if count > length:
+        raise ValueError("section %r holds %d items, cannot grow it to %d" % (name.rstrip(b"\x00"), length, count))
+    _SECTION.pack_into(buffer, position, name, typecode, offset, count)
+
+
+def open_sections(filename):
+    """Memory-map a map file and return (mmap, {name: memoryview}).
+
+    The views point straight into the mapping; nothing is copied."""
+    _check_byteorder()
+    with open(filename, 'rb') as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        magic, version, count = _HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC:
+            raise ValueError("%s is not a map file" % filename)
+        if version != FORMAT_VERSION:
+            raise ValueError("%s has map format version %d, expected %d" % (filename, version, FORMAT_VERSION))
+        base = memoryview(mapped)
+        views = {}
+        for i in range(count):
+            name, typecode, offset, length = _SECTION.unpack_from(mapped, _HEADER.size + i * _SECTION.size)
+            typecode = typecode.decode("ascii")
+            end = offset + length * array(typecode).itemsize
+            views[name.rstrip(b"\x00").decode("ascii")] = base[offset:end].cast(typecode)
+        base.release()
+    except Exception:
+        mapped.close()
+        raise
+    return mapped, views
+
+
+def _align(position):
+    return (position + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def _typecode(values):
+    return values.typecode if isinstance(values, array) else values.format
+
+
+def require_two_way(M, engine):
+    """Raise ValueError if M has one-way roads.
+
+    Bidirectional search, landmarks, contraction hierarchies, components,
+    partitions, D* Lite and Yen's spur searches read every road as usable in
+    both directions, which only holds for maps that are not directed."""
+    if getattr(M, 'directed', False):
+        raise ValueError("%s needs two-way roads, but the map has one-way roads" % engine)
+
+
+class MapTable(object):
+    """Base for precomputed tables that are saved in a map file with the map.
+
+    A subclass names its arrays in EXTRA_NAMES (at most 16 bytes each), returns
+    them in that order from extra_arrays and, if its constructor takes
+    something else, rebuilds itself from them in from_extras."""
+    EXTRA_NAMES = ()
+
+    def extra_arrays(self):
+        """Return the arrays to save, in EXTRA_NAMES order"""
+        raise NotImplementedError
+
+    @classmethod
+    def from_extras(cls, M, arrays):
+        """Rebuild a table of map M from the arrays extra_arrays returned"""
+        return cls(*arrays)
+
+    def attach(self, M):
+        """Store the table in the map's extras so saving the map writes it out"""
+        M.extras.update(zip(self.EXTRA_NAMES, self.extra_arrays()))
+
+    @classmethod
+    def from_map(cls, M):
+        """Load the table saved with a map, or return None if it has none"""
+        if any(name not in M.extras for name in cls.EXTRA_NAMES):
+            return None
+        return cls.from_extras(M, [M.extras[name] for name in cls.EXTRA_NAMES])
+
+
+def _check_byteorder():
+    """Map files are little-endian and their arrays are used in place, unconverted"""
+    if sys.byteorder != "little":
+        raise ValueError("map files are little-endian and cannot be used on this %s-endian host" % sys.byteorder)
+
+
+class _Intersections(object):
+    """Read-only mapping view node -> (x, y) over the coordinate arrays"""
+    def __init__(self, xs, ys):
+        self._xs = xs
+        self._ys = ys
+
+    def __getitem__(self, node):
+        if not 0 <= node < len(self._xs):
+            raise KeyError(node)
+        return (self._xs[node], self._ys[node])
+
+    def __contains__(self, node):
+        return isinstance(node, int) and 0 <= node < len(self._xs)
+
+    def __iter__(self):
+        return iter(range(len(self._xs)))
+
+    def __len__(self):
+        return len(self._xs)
+
+    def keys(self):
+        return range(len(self._xs))
+
+    def items(self):
+        return ((node, (self._xs[node], self._ys[node])) for node in range(len(self._xs)))
+
+
+class _Adjacency(object):
+    """Read-only sequence view node -> slice of a CSR edge array"""
+    def __init__(self, offsets, values):
+        self._offsets = offsets
+        self._values = values if isinstance(values, memoryview) else memoryview(values)
+
+    def __getitem__(self, node):
+        return self._values[self._offsets[node]:self._offsets[node + 1]]
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __iter__(self):
+        for node in range(len(self)):
+            yield self[node]
+
+
+class CompactMap(object):
+    """Road network stored as CSR arrays.
+
+    Nodes are the integers 0..n-1, the same ids helpers.Map uses to index
+    its roads list. coord_typecode is "d" (float64) or "f" (float32) and
+    applies to both coordinates and road lengths.
+
+    heuristic_scale is the smallest road cost per unit of straight-line
+    length; it is 1.0 when the costs are the lengths themselves.
+
+    directed is True if some roads are one-way, i.e. roads[a] may hold b
+    while roads[b] lacks a; see require_two_way.
+
+    extras holds additional named arrays stored alongside the map, such as
+    the MapTable heuristic tables; they are saved and opened with it."""
+    def __init__(self, xs, ys, offsets, neighbors, lengths, extras=None, heuristic_scale=1.0, directed=False):
+        if not (len(xs) == len(ys) == len(offsets) - 1):
+            raise ValueError("xs, ys and offsets do not describe the same number of nodes")
+        if not (len(neighbors) == len(lengths) == offsets[-1]):
+            raise ValueError("neighbors and lengths must hold offsets[-1] entries")
+        self.xs = xs
+        self.ys = ys
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.lengths = lengths
+        self.extras = dict(extras) if extras else {}
+        self.heuristic_scale = heuristic_scale
+        self.directed = directed
+        self._mmap = None
+        self._views = []
+        self.intersections = _Intersections(xs, ys)
+        self.roads = _Adjacency(offsets, neighbors)
+        self.road_lengths = _Adjacency(offsets, lengths)
+
+    @classmethod
+    def from_map_dict(cls, map_dict, coord_typecode="d"):
+        """Build a CompactMap from a load_map_graph style dictionary.
+
+        Like load_map_graph the roads are made symmetric and duplicates are
+        dropped, so every connection can be travelled both ways."""
+        n = len(map_dict)
+        if sorted(map_dict) != list(range(n)):
+            raise ValueError("map nodes must be numbered 0..%d" % (n - 1))
+        adjacency = [dict() for _ in range(n)]     # dict keeps insertion order
+        for node in range(n):
+            for con_node in map_dict[node]['connections']:
+                adjacency[node][con_node] = None
+                adjacency[con_node][node] = None
+        positions = [map_dict[node]['pos'] for node in range(n)]
+        return cls._from_adjacency(positions, adjacency, coord_typecode)
+
+    @classmethod
+    def from_map(cls, M, coord_typecode="d"):
+        """Build a CompactMap from a helpers.Map, keeping its road costs and extras"""
+        n = len(M.intersections)
+        positions = [M.intersections[node] for node in range(n)]
+        compact = cls._from_adjacency(positions, M.roads, coord_typecode, M.road_lengths)
+        compact.heuristic_scale = M.heuristic_scale
+        compact.directed = getattr(M, 'directed', False)
+        compact.extras.update(getattr(M, 'extras', {}))
+        return compact
+
+    @classmethod
+    def _from_adjacency(cls, positions, adjacency, coord_typecode, costs=None):
+        xs = array(coord_typecode, (pos[0] for pos in positions))
+        ys = array(coord_typecode, (pos[1] for pos in positions))
+        offsets = array('q', [0])
+        neighbors = array('i')
+        lengths = array(coord_typecode)
+        for node, roads in enumerate(adjacency):
+            x, y = positions[node]
+            neighbors.extend(roads)
+            if costs is not None:
+                lengths.extend(costs[node])
+            else:
+                lengths.extend(math.sqrt((positions[con_node][0] - x)**2 + (positions[con_node][1] - y)**2)
+                               for con_node in roads)
+            offsets.append(len(neighbors))
+        return cls(xs, ys, offsets, neighbors, lengths)
+
+    def save(self, filename):
+        """Save the map and its extras to a binary map file"""
+        sections = [(name, getattr(self, name)) for name in _CORE_SECTIONS]
+        sections.append(("heuristic_scale", array('d', [self.heuristic_scale])))
+        sections.append(("directed", array('b', [int(self.directed)])))
+        sections.extend(sorted(self.extras.items()))
+        write_sections(filename, sections)
+
+    @classmethod
+    def open(cls, filename):
+        """Open a map file saved by CompactMap.save, memory-mapped read-only"""
+        mapped, views = open_sections(filename)
+        missing = [name for name in _CORE_SECTIONS if name not in views]
+        if missing:
+            for view in views.values():
+                view.release()
+            mapped.close()
+            raise ValueError("%s is missing map sections: %s" % (filename, ", ".join(missing)))
+        core = [views.pop(name) for name in _CORE_SECTIONS]
+        scale = views.pop("heuristic_scale", None)
+        directed = views.pop("directed", None)
+        M = cls(*core, extras=views, heuristic_scale=scale[0] if scale is not None else 1.0,
+                directed=bool(directed[0]) if directed is not None else False)
+        for view in (scale, directed):
+            if view is not None:
+                view.release()
+        M._mmap = mapped
+        M._views = core + list(views.values())     # extras may be replaced by attach
+        return M
+
+    def close(self):
+        """Release a memory-mapped map; the map cannot be used afterwards"""
+        if self._mmap is None:
+            return
+        for view in self._views:
+            view.release()
+        self._views = []
+        self._mmap.close()
+        self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def num_nodes(self):
+        return len(self.xs)
+
+    @property
+    def num_edges(self):
+        """Number of directed road entries, i.e. twice the number of two-way roads on an undirected map"""
+        return len(self.neighbors)
+
+    def degree(self, node):
+        return self.offsets[node + 1] - self.offsets[node]
+
+    @property
+    def nbytes(self):
+        """Bytes held by the node and edge arrays"""
+        return sum(len(a) * a.itemsize for a in (self.xs, self.ys, self.offsets, self.neighbors, self.lengths))
@@ -0,0 +1,208 @@
+"""Contraction Hierarchies preprocessing and queries.
+
+Nodes are contracted one at a time in order of importance. Contracting a node
+removes it from the remaining graph and adds a shortcut between two of its
+neighbors whenever the route through it is the only shortest connection
+between them. Every node then keeps the edges to its neighbors that were
+still present when it was contracted, i.e. the edges to higher-ranked nodes:
+the upward graph.
+
+A query is a bidirectional Dijkstra that only ever moves upward, which
+settles a few hundred nodes even on very large maps. Roads must be two-way
+(see compact_map.require_two_way), so the downward graph used by the
+backward search is the upward graph read in reverse and is not stored
+separately. Shortcuts remember the node they bypass, which is how a result
+is unpacked back into a full node path.
+"""
+from array import array
+import heapq
+
+from compact_map import MapTable, require_two_way
+
+
+class ContractionHierarchy(MapTable):
+    """Upward graph of a contraction hierarchy in CSR form.
+
+    rank[v] is the contraction order of node v. The upward edges of v are
+    targets/weights/middles[offsets[v]:offsets[v + 1]], where middles holds
+    the bypassed node of a shortcut and -1 for an original road."""
+    EXTRA_NAMES = ("ch.rank", "ch.offsets", "ch.targets", "ch.weights", "ch.middles")
+
+    def __init__(self, rank, offsets, targets, weights, middles):
+        self.rank = rank
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.middles = middles
+
+    @classmethod
+    def build(cls, M, settle_limit=50):
+        """Contract every node of M and return the resulting hierarchy.
+
+        settle_limit bounds each witness search; a smaller limit makes the
+        preprocessing faster at the price of some unnecessary shortcuts."""
+        require_two_way(M, "ContractionHierarchy")
+        n = len(M.intersections)
+        graph = [dict() for _ in range(n)]      # node -> {neighbor: (weight, middle)}
+        for node in range(n):
+            for con_node, length in zip(M.roads[node], M.road_lengths[node]):
+                if con_node != node and length < graph[node].get(con_node, (float('inf'),))[0]:
+                    graph[node][con_node] = (length, -1)
+                    graph[con_node][node] = (length, -1)
+
+        deleted = [0] * n
+        def priority(node):
+            shortcuts = _shortcuts(graph, node, settle_limit)
+            return len(shortcuts) - len(graph[node]) + deleted[node]
+
+        queue = [(priority(node), node) for node in range(n)]
+        heapq.heapify(queue)
+        rank = array('i', [0]) * n
+        upward = [None] * n
+        order = 0
+        while queue:
+            _, node = heapq.heappop(queue)
+            current = priority(node)
+            if queue and current > queue[0][0]:
+                heapq.heappush(queue, (current, node))  # lazy update: no longer the least important
+                continue
+            for u, x, weight in _shortcuts(graph, node, settle_limit):
+                if weight < graph[u].get(x, (float('inf'),))[0]:
+                    graph[u][x] = (weight, node)
+                    graph[x][u] = (weight, node)
+            upward[node] = graph[node]
+            for con_node in graph[node]:
+                del graph[con_node][node]
+                deleted[con_node] += 1
+            graph[node] = {}
+            rank[node] = order
+            order += 1
+
+        offsets = array('q', [0])
+        targets = array('i')
+        weights = array('d')
+        middles = array('i')
+        for node in range(n):
+            for con_node, (weight, middle) in upward[node].items():
+                targets.append(con_node)
+                weights.append(weight)
+                middles.append(middle)
+            offsets.append(len(targets))
+        return cls(rank, offsets, targets, weights, middles)
+
+    def query(self, start, goal):
+        """Return (path, cost) of the shortest route, or (None, inf) if there is none"""
+        if start == goal:
+            return [start], 0.0
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        dists = ({start: 0.0}, {goal: 0.0})
+        parents = ({start: -1}, {goal: -1})
+        heaps = [[(0.0, start)], [(0.0, goal)]]
+        best_cost = float('inf')
+        meeting = None
+        while heaps[0] or heaps[1]:
+            for side in (0, 1):
+                heap = heaps[side]
+                if not heap:
+                    continue
+                if heap[0][0] >= best_cost:
+                    heaps[side] = []    # nothing left on this side can improve the result
+                    continue
+                d, node = heapq.heappop(heap)
+                dist, other = dists[side], dists[1 - side]
+                if d > dist[node]:
+                    continue
+                if node in other and d + other[node] < best_cost:
+                    best_cost = d + other[node]
+                    meeting = node
+                begin, end = offsets[node], offsets[node + 1]
+                # stall-on-demand: a higher neighbor reaches this node more cheaply,
+                # so its distance here is not final and relaxing it is wasted work
+                if any(dist.get(targets[i], float('inf')) + weights[i] < d for i in range(begin, end)):
+                    continue
+                parent = parents[side]
+                for i in range(begin, end):
+                    con_node = targets[i]
+                    candidate = d + weights[i]
+                    if candidate < dist.get(con_node, float('inf')):
+                        dist[con_node] = candidate
+                        parent[con_node] = node
+                        heapq.heappush(heap, (candidate, con_node))
+        if meeting is None:
+            return None, float('inf')
+        up_path = [meeting]
+        while parents[0][up_path[-1]] != -1:
+            up_path.append(parents[0][up_path[-1]])
+        up_path.reverse()
+        node = meeting
+        while parents[1][node] != -1:
+            up_path.append(parents[1][node])
+            node = parents[1][node]
+        path = [up_path[0]]
+        for u, v in zip(up_path, up_path[1:]):
+            self._unpack(u, v, path)
+        return path, best_cost
+
+    def _middle(self, u, v):
+        """Return the node bypassed by the edge u-v, or -1 for an original road"""
+        if self.rank[u] > self.rank[v]:
+            u, v = v, u
+        for i in range(self.offsets[u], self.offsets[u + 1]):
+            if self.targets[i] == v:
+                return self.middles[i]
+        raise KeyError((u, v))
+
+    def _unpack(self, u, v, path):
+        """Append the original nodes after u up to and including v to path"""
+        stack = [(u, v)]
+        while stack:
+            a, b = stack.pop()
+            middle = self._middle(a, b)
+            if middle == -1:
+                path.append(b)
+            else:
+                stack.append((middle, b))
+                stack.append((a, middle))
+
+    def extra_arrays(self):
+        return (self.rank, self.offsets, self.targets, self.weights, self.middles)
+
+
+def _shortcuts(graph, node, settle_limit):
+    """Return the (u, x, weight) shortcuts needed to contract node"""
+    neighbors = list(graph[node].items())
+    shortcuts = []
+    for i, (u, (weight_u, _)) in enumerate(neighbors):
+        others = neighbors[i + 1:]
+        if not others:
+            break
+        max_cost = weight_u + max(weight for _, (weight, _) in others)
+        witness = _witness_search(graph, u, node, max_cost, settle_limit)
+        for x, (weight_x, _) in others:
+            if witness.get(x, float('inf')) > weight_u + weight_x:
+                shortcuts.append((u, x, weight_u + weight_x))
+    return shortcuts
+
+
+def _witness_search(graph, source, skip, max_cost, settle_limit):
+    """Bounded Dijkstra from source that avoids skip; returns tentative distances.
+
+    Tentative distances are lengths of real paths, so they are valid witnesses
+    even when the search stops early."""
+    dist = {source: 0.0}
+    heap = [(0.0, source)]
+    settled = 0
+    while heap:
+        d, node = heapq.heappop(heap)
+        if d > dist[node]:
+            continue
+        if d > max_cost or settled >= settle_limit:
+            break
+        settled += 1
+        for con_node, (weight, _) in graph[node].items():
+            if con_node == skip:
+                continue
+            if d + weight < dist.get(con_node, float('inf')):
+                dist[con_node] = d + weight
+                heapq.heappush(heap, (d + weight, con_node))
+    return dist
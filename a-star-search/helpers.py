@@ -1,9 +1,10 @@
+import math
 import networkx as nx
-import pickle
 import plotly.plotly as py
 import random
 from plotly.graph_objs import *
 from plotly.offline import init_notebook_mode, plot, iplot
+from compact_map import CompactMap
 init_notebook_mode(connected=True)
 
 
@@ -65,14 +66,37 @@ map_40_dict = {
 
 
 class Map:
-	def __init__(self, G):
+	"""Road map backed by a networkx graph.
+
+	road_lengths[node] holds the cost of each road in roads[node]. By default
+	that is the straight-line length; pass weight to use an edge attribute
+	such as travel time instead. heuristic_scale is then the smallest cost per
+	unit of length, so a scaled straight-line distance remains a lower bound.
+	A directed graph gives one-way roads and sets directed.
+	extras holds precomputed tables attached to the map; save writes them out."""
+	def __init__(self, G, weight=None):
 		self._graph = G
+		self.extras = {}
+		self.directed = G.is_directed()
 		self.intersections = nx.get_node_attributes(G, "pos")
 		self.roads = [list(G[node]) for node in G.nodes()]
+		self.road_lengths = [[self._road_cost(node, con_node, weight) for con_node in G[node]] for node in G.nodes()]
+		self.heuristic_scale = 1.0
+		if weight is not None:
+			ratios = [cost / self._road_cost(node, con_node, None)
+				for node in G.nodes() for con_node, cost in zip(G[node], self.road_lengths[node])
+				if self._road_cost(node, con_node, None) > 0]
+			self.heuristic_scale = min(ratios) if ratios else 1.0
+
+	def _road_cost(self, node, con_node, weight):
+		if weight is not None:
+			return self._graph[node][con_node][weight]
+		x0, y0 = self.intersections[node]
+		x1, y1 = self.intersections[con_node]
+		return math.sqrt((x1 - x0)**2 + (y1 - y0)**2)
 
 	def save(self, filename):
-		with open(filename, 'wb') as f:
-			pickle.dump(self._graph, f)
+		CompactMap.from_map(self).save(filename)
 
 def load_map_graph(map_dict):
 	G = nx.Graph()
@@ -91,6 +115,10 @@ def load_map_40():
 	G = load_map_graph(map_40_dict)
 	return Map(G)
 
+def load_map_file(filename):
+	"""Open a map saved with Map.save, memory-mapped and searchable by PathPlanner"""
+	return CompactMap.open(filename)
+
 def show_map(M, start=None, goal=None, path=None):
     G = M._graph
     pos = nx.get_node_attributes(G, 'pos')
@@ -0,0 +1,351 @@
+"""Jump Point Search on 8-connected occupancy grids.
+
+On a uniform-cost grid most shortest paths have many symmetric twins that
+plain A* expands one by one. Jump Point Search (Harabor and Grastien)
+prunes them: from each expanded cell it scans straight and diagonal lines
+and only queues the cells where the scan is forced to turn, the jump
+points. The open set then holds a handful of cells instead of whole
+corridors.
+
+This is the variant that never cuts corners: a diagonal step is allowed
+only when both cells beside it are free, as a robot with a footprint needs.
+Straight steps cost 1, diagonal steps sqrt(2), and the octile distance is
+the heuristic.
+
+OccupancyGrid keeps one bit per cell, so a million-cell warehouse floor
+takes 125 KB. Straight scans, where JPS spends most of its time, test a
+whole row or column at once with bit operations on Python ints that are
+built from those bits on the first search. Cell (x, y) is node
+y * width + x, and JumpPointPlanner returns full cell-by-cell paths of
+such node ids, in the same form as PathPlanner.path.
+
+    grid = OccupancyGrid.from_rows(["....#", "..#..", "....."])
+    JumpPointPlanner(grid, grid.node(0, 0), grid.node(4, 2)).path
+"""
+from array import array
+import heapq
+import math
+
+from compact_map import CompactMap, MapTable, open_sections, write_sections
+
+SQRT2 = math.sqrt(2.0)
+_DIRECTIONS = ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1))
+
+
+class OccupancyGrid(MapTable):
+    """Bit-packed obstacle grid; a set bit marks a blocked cell"""
+    EXTRA_NAMES = ("grid.shape", "grid.bits")
+
+    def __init__(self, width, height, bits=None):
+        if width < 1 or height < 1:
+            raise ValueError("a grid needs at least one cell, got %dx%d" % (width, height))
+        size = (width * height + 7) // 8
+        if bits is None:
+            bits = bytearray(size)
+        elif len(bits) != size:
+            raise ValueError("a %dx%d grid needs %d bytes of bits, got %d" % (width, height, size, len(bits)))
+        self.width = width
+        self.height = height
+        self.bits = bits
+        self.version = 0        # bumped by every set_blocked
+        self._mmap = None
+        self._lines = None
+
+    @classmethod
+    def from_rows(cls, rows, blocked="#"):
+        """Build a grid from equally long rows, top row first; characters in blocked are obstacles"""
+        rows = list(rows)
+        grid = cls(len(rows[0]) if rows else 0, len(rows))
+        for y, row in enumerate(rows):
+            if len(row) != grid.width:
+                raise ValueError("row %d has %d cells, expected %d" % (y, len(row), grid.width))
+            for x, cell in enumerate(row):
+                if cell in blocked:
+                    grid.set_blocked(x, y)
+        return grid
+
+    def node(self, x, y):
+        return y * self.width + x
+
+    def cell(self, node):
+        """Return the (x, y) of a node id"""
+        y, x = divmod(node, self.width)
+        return x, y
+
+    def __len__(self):
+        return self.width * self.height
+
+    def is_blocked(self, x, y):
+        """True for obstacles and for cells outside the grid"""
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return True
+        i = y * self.width + x
+        return self.bits[i >> 3] >> (i & 7) & 1 == 1
+
+    def set_blocked(self, x, y, blocked=True):
+        self.version += 1
+        i = y * self.width + x
+        if blocked:
+            self.bits[i >> 3] |= 1 << (i & 7)
+        else:
+            self.bits[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+
+    @property
+    def nbytes(self):
+        return len(self.bits)
+
+    def lines(self):
+        """Return (rows, columns): the blocked bits of every row and column as ints.
+
+        Bit x of rows[y] and bit y of columns[x] are set when cell (x, y) is
+        blocked. Straight scans test a whole line at once on these; they are
+        built on first use and rebuilt after the grid changes."""
+        if self._lines is not None and self._lines[0] == self.version:
+            return self._lines[1], self._lines[2]
+        width, height = self.width, self.height
+        packed = int.from_bytes(bytes(self.bits), 'little')
+        row_mask = (1 << width) - 1
+        rows = [(packed >> (y * width)) & row_mask for y in range(height)]
+        columns = [0] * width
+        for y, row in enumerate(rows):
+            while row:     # only obstacles cost anything here
+                low = row & -row
+                columns[low.bit_length() - 1] |= 1 << y
+                row ^= low
+        self._lines = (self.version, rows, columns)
+        return rows, columns
+
+    def to_compact_map(self):
+        """The grid as a CompactMap with one node per cell, for engines that need a graph.
+
+        Blocked cells keep their node id but get no roads; moves follow the
+        same no-corner-cutting rule as JumpPointPlanner."""
+        width, height = self.width, self.height
+        free = lambda x, y: not self.is_blocked(x, y)
+        xs = array('d', (float(x) for y in range(height) for x in range(width)))
+        ys = array('d', (float(y) for y in range(height) for x in range(width)))
+        offsets = array('q', [0])
+        neighbors = array('i')
+        lengths = array('d')
+        for y in range(height):
+            for x in range(width):
+                if free(x, y):
+                    for dx, dy in _DIRECTIONS:
+                        if free(x + dx, y + dy) and (dx == 0 or dy == 0 or free(x + dx, y) and free(x, y + dy)):
+                            neighbors.append((y + dy) * width + x + dx)
+                            lengths.append(SQRT2 if dx and dy else 1.0)
+                offsets.append(len(neighbors))
+        return CompactMap(xs, ys, offsets, neighbors, lengths)
+
+    def extra_arrays(self):
+        return (array('q', [self.width, self.height]), array('B', self.bits))
+
+    @classmethod
+    def from_extras(cls, M, arrays):
+        (width, height), bits = arrays
+        return cls(width, height, bits)
+
+    def save(self, filename):
+        """Save the grid on its own to a binary file in the map file format"""
+        write_sections(filename, list(zip(self.EXTRA_NAMES, self.extra_arrays())))
+
+    @classmethod
+    def open(cls, filename):
+        """Open a grid saved with save, memory-mapped read-only"""
+        mapped, views = open_sections(filename)
+        if any(name not in views for name in cls.EXTRA_NAMES):
+            for view in views.values():
+                view.release()
+            mapped.close()
+            raise ValueError("%s does not hold an occupancy grid" % filename)
+        grid = cls.from_extras(None, [views[name] for name in cls.EXTRA_NAMES])
+        grid._mmap = mapped
+        return grid
+
+
+class JumpPointPlanner(object):
+    """Shortest 8-connected paths on an OccupancyGrid by Jump Point Search.
+
+    Like PathPlanner, giving start and goal node ids runs the search right
+    away and stores the result in path (False when there is none)."""
+    def __init__(self, grid, start=None, goal=None):
+        self.grid = grid
+        self.start = start
+        self.goal = goal
+        self.cost = None
+        self.expansions = 0     # jump points expanded by the last search
+        self._forced = {}       # (horizontal, line, direction) -> forced neighbor bits
+        self._forced_version = grid.version
+        self.path = self.run_search() if start is not None and goal is not None else None
+
+    def run_search(self):
+        """Search from start to goal; returns the path, or False if there is none"""
+        path, self.cost = self.search(self.start, self.goal)
+        if path is None:
+            self.path = None
+            return False
+        self.path = path
+        return self.path
+
+    def search_many(self, pairs):
+        """Answer (start, goal) queries in order, returns (paths, costs) like PathPlanner.search_many"""
+        paths = []
+        costs = []
+        for start, goal in pairs:
+            path, cost = self.search(start, goal)
+            paths.append(path)
+            costs.append(cost)
+        return paths, costs
+
+    def search(self, start, goal):
+        """Return (path, cost) from start to goal, or (None, inf) if goal cannot be reached"""
+        grid = self.grid
+        sx, sy = grid.cell(start)
+        gx, gy = grid.cell(goal)
+        self.expansions = 0
+        if self._forced_version != grid.version:
+            self._forced = {}
+            self._forced_version = grid.version
+        if grid.is_blocked(sx, sy) or grid.is_blocked(gx, gy):
+            return None, float('inf')
+        gScore = {(sx, sy): 0.0}
+        cameFrom = {}
+        closed = set()
+        heap = [(_octile(sx, sy, gx, gy), sx, sy)]
+        while heap:
+            _, x, y = heapq.heappop(heap)
+            if (x, y) in closed:
+                continue
+            if (x, y) == (gx, gy):
+                return self._expand_path(cameFrom, gx, gy), gScore[(gx, gy)]
+            closed.add((x, y))
+            self.expansions += 1
+            g = gScore[(x, y)]
+            for nx, ny in self._pruned_neighbors(x, y, cameFrom.get((x, y))):
+                point = self._jump(nx, ny, nx - x, ny - y, gx, gy)
+                if point is None or point in closed:
+                    continue
+                jx, jy = point
+                tentative = g + _octile(x, y, jx, jy)
+                if tentative < gScore.get(point, float('inf')):
+                    gScore[point] = tentative
+                    cameFrom[point] = (x, y)
+                    heapq.heappush(heap, (tentative + _octile(jx, jy, gx, gy), jx, jy))
+        return None, float('inf')
+
+    def _pruned_neighbors(self, x, y, parent):
+        """Cells worth scanning from (x, y) when it was reached from parent"""
+        free = lambda cx, cy: not self.grid.is_blocked(cx, cy)
+        if parent is None:
+            return [(x + dx, y + dy) for dx, dy in _DIRECTIONS
+                    if free(x + dx, y + dy) and (dx == 0 or dy == 0 or free(x + dx, y) and free(x, y + dy))]
+        dx = (x > parent[0]) - (x < parent[0])
+        dy = (y > parent[1]) - (y < parent[1])
+        neighbors = []
+        if dx and dy:
+            if free(x, y + dy):
+                neighbors.append((x, y + dy))
+            if free(x + dx, y):
+                neighbors.append((x + dx, y))
+            if free(x, y + dy) and free(x + dx, y):
+                neighbors.append((x + dx, y + dy))
+        else:
+            # straight move: a side cell is only worth a look when the cell
+            # behind it is blocked (a forced neighbor); otherwise the parent
+            # reaches it, and the diagonal past it, at least as cheaply
+            ahead = free(x + dx, y + dy)
+            if ahead:
+                neighbors.append((x + dx, y + dy))
+            for sx, sy in ((dy, dx), (-dy, -dx)):
+                if free(x + sx, y + sy) and not free(x + sx - dx, y + sy - dy):
+                    neighbors.append((x + sx, y + sy))
+                    if ahead:
+                        neighbors.append((x + sx + dx, y + sy + dy))
+        return neighbors
+
+    def _jump(self, x, y, dx, dy, gx, gy):
+        """Scan from (x, y) in direction (dx, dy); return the first jump point or None"""
+        if not (dx and dy):
+            return self._scan(x, y, dx, dy, gx, gy)
+        blocked = self.grid.is_blocked
+        while True:
+            if blocked(x, y):
+                return None
+            if x == gx and y == gy:
+                return x, y
+            # a diagonal scan stops where a straight scan off it finds something
+            if self._scan(x + dx, y, dx, 0, gx, gy) or self._scan(x, y + dy, 0, dy, gx, gy):
+                return x, y
+            if blocked(x + dx, y) or blocked(x, y + dy):
+                return None     # no corner cutting
+            x += dx
+            y += dy
+
+    def _scan(self, x, y, dx, dy, gx, gy):
+        """Straight scan from (x, y); returns the first jump point or None.
+
+        The whole line is tested with bit operations: a cell stops the scan
+        if it is blocked, is the goal, or has a forced neighbor, i.e. a free
+        side cell whose neighbor behind it is blocked, so it can only be
+        reached through this cell."""
+        rows, columns = self.grid.lines()
+        if dy == 0:
+            lines, index, position, direction = rows, y, x, dx
+            goal = 1 << gx if gy == y else 0
+        else:
+            lines, index, position, direction = columns, x, y, dy
+            goal = 1 << gy if gx == x else 0
+        length = self.grid.width if dy == 0 else self.grid.height
+        if not (0 <= index < len(lines) and 0 <= position < length):
+            return None
+        line = lines[index]
+        key = (dy == 0, index, direction)
+        forced = self._forced.get(key)
+        if forced is None:
+            full = (1 << length) - 1
+            forced = 0
+            for side in (index - 1, index + 1):
+                beside = lines[side] if 0 <= side < len(lines) else full    # outside the grid is blocked
+                if direction > 0:
+                    behind = ((beside << 1) | 1) & full
+                else:
+                    behind = (beside >> 1) | (1 << (length - 1))
+                forced |= (full ^ beside) & behind
+            self._forced[key] = forced
+        events = line | forced | goal
+        if direction > 0:
+            ahead = events >> position
+            if not ahead:
+                return None     # ran off the grid
+            hit = position + (ahead & -ahead).bit_length() - 1
+        else:
+            ahead = events & ((1 << (position + 1)) - 1)
+            if not ahead:
+                return None
+            hit = ahead.bit_length() - 1
+        if line >> hit & 1:
+            return None     # an obstacle comes first
+        return (hit, y) if dy == 0 else (x, hit)
+
+    def _expand_path(self, cameFrom, gx, gy):
+        """Fill in the cells between consecutive jump points and return node ids from start to goal"""
+        points = [(gx, gy)]
+        while points[-1] in cameFrom:
+            points.append(cameFrom[points[-1]])
+        points.reverse()
+        width = self.grid.width
+        path = [points[0][1] * width + points[0][0]]
+        for (x, y), (tx, ty) in zip(points, points[1:]):
+            dx = (tx > x) - (tx < x)
+            dy = (ty > y) - (ty < y)
+            while (x, y) != (tx, ty):
+                x += dx
+                y += dy
+                path.append(y * width + x)
+        return path
+
+
+def _octile(x0, y0, x1, y1):
+    dx = abs(x1 - x0)
+    dy = abs(y1 - y0)
+    return (SQRT2 - 1.0) * min(dx, dy) + max(dx, dy)
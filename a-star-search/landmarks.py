@@ -0,0 +1,158 @@
+"""ALT preprocessing: landmarks and triangle-inequality lower bounds.
+
+A handful of landmark nodes are chosen and a Dijkstra search is run from each
+of them. For any landmark L the triangle inequality gives
+
+    dist(v, t) >= |dist(L, t) - dist(L, v)|
+
+and the maximum over all landmarks is a consistent heuristic that is usually
+much tighter than the straight-line distance on road networks with detours.
+"""
+from array import array
+import heapq
+import random
+
+from compact_map import MapTable, require_two_way
+
+STRATEGIES = ("farthest", "avoid")
+
+
+def dijkstra(M, source):
+    """Single-source Dijkstra over M.
+
+    Returns the distances (infinity if unreachable) and parents (-1 for the
+    source and unreachable nodes) as flat arrays, and the settle order."""
+    n = len(M.intersections)
+    dist = array('d', [float('inf')]) * n
+    parent = array('i', [-1]) * n
+    settled = []
+    done = bytearray(n)
+    dist[source] = 0.0
+    heap = [(0.0, source)]
+    while heap:
+        d, node = heapq.heappop(heap)
+        if done[node]:
+            continue
+        done[node] = 1
+        settled.append(node)
+        for con_node, length in zip(M.roads[node], M.road_lengths[node]):
+            if d + length < dist[con_node]:
+                dist[con_node] = d + length
+                parent[con_node] = node
+                heapq.heappush(heap, (d + length, con_node))
+    return dist, parent, settled
+
+
+class LandmarkTable(MapTable):
+    """Landmark distance table stored node-major in one flat array.
+
+    distances[v * k + i] is the road distance between node v and the i-th
+    landmark, so the k values needed for one lookup are contiguous."""
+    EXTRA_NAMES = ("alt.landmarks", "alt.distances")
+
+    def __init__(self, landmarks, distances):
+        self.landmarks = landmarks
+        self.distances = distances
+        self.k = len(landmarks)
+        if self.k == 0 or len(distances) % self.k:
+            raise ValueError("distances must hold one row of %d values per node" % self.k)
+        self._target = None
+        self._target_row = None
+
+    @classmethod
+    def build(cls, M, count=8, strategy="farthest", seed=0):
+        """Select count landmarks on M and compute their distance table.
+
+        strategy "farthest" repeatedly picks the node farthest from the
+        landmarks chosen so far; "avoid" picks landmarks in the regions of a
+        shortest path tree where the current bound is weakest."""
+        if strategy not in STRATEGIES:
+            raise ValueError("strategy must be one of %s, got %r" % (", ".join(STRATEGIES), strategy))
+        require_two_way(M, "LandmarkTable")
+        n = len(M.intersections)
+        count = min(count, n)
+        rng = random.Random(seed)
+        landmarks = []
+        columns = []
+        if strategy == "farthest":
+            # start from the node farthest from a random one, then keep adding
+            # the node with the largest distance to its closest landmark.
+            # Only the random node's component is covered.
+            dist, _, _ = dijkstra(M, rng.randrange(n))
+            closest = dist
+            while len(landmarks) < count:
+                candidates = [node for node in range(n) if node not in landmarks and closest[node] != float('inf')]
+                if not candidates:
+                    break
+                landmark = max(candidates, key=lambda node: closest[node])
+                dist, _, _ = dijkstra(M, landmark)
+                landmarks.append(landmark)
+                columns.append(dist)
+                closest = [min(a, b) for a, b in zip(closest, dist)] if len(landmarks) > 1 else dist
+        else:
+            while len(landmarks) < count:
+                landmark = cls._avoid_candidate(M, landmarks, columns, rng)
+                dist, _, _ = dijkstra(M, landmark)
+                landmarks.append(landmark)
+                columns.append(dist)
+        count = len(landmarks)
+        distances = array('d', bytes(8 * n * count))
+        for i, column in enumerate(columns):
+            distances[i::count] = array('d', column)
+        return cls(array('i', landmarks), distances)
+
+    @staticmethod
+    def _avoid_candidate(M, landmarks, columns, rng):
+        """Pick the next landmark with the avoid heuristic (Goldberg and Werneck)"""
+        n = len(M.intersections)
+        root = rng.randrange(n)
+        dist, parent, settled = dijkstra(M, root)
+        # weight = how much the current landmark bound underestimates dist(root, v)
+        size = [0.0] * n
+        for node in settled:
+            bound = 0.0
+            for column in columns:
+                if column[root] != float('inf') and column[node] != float('inf'):
+                    bound = max(bound, abs(column[root] - column[node]))
+            size[node] = dist[node] - bound
+        # subtree sizes, bottom-up; subtrees holding a landmark are discarded
+        blocked = [False] * n
+        for landmark in landmarks:
+            blocked[landmark] = True
+        children = [[] for _ in range(n)]
+        for node in reversed(settled):
+            if blocked[node]:
+                size[node] = 0.0
+            if parent[node] != -1:
+                children[parent[node]].append(node)
+                size[parent[node]] += size[node]
+                blocked[parent[node]] = blocked[parent[node]] or blocked[node]
+        for node in settled:
+            if blocked[node]:
+                size[node] = 0.0
+        # walk down from the heaviest subtree to a leaf
+        node = max(settled, key=lambda v: size[v])
+        while children[node]:
+            node = max(children[node], key=lambda v: size[v])
+        if node in landmarks:
+            node = rng.choice([v for v in range(n) if v not in landmarks])
+        return node
+
+    def lower_bound(self, node, target):
+        """Triangle-inequality lower bound on the road distance from node to target"""
+        k = self.k
+        if target != self._target:
+            self._target = target
+            self._target_row = self.distances[target * k:(target + 1) * k]
+        bound = 0.0
+        for a, b in zip(self.distances[node * k:(node + 1) * k], self._target_row):
+            # comparisons with inf - inf (landmark in another component) are
+            # False, so such landmarks are ignored
+            if a - b > bound:
+                bound = a - b
+            elif b - a > bound:
+                bound = b - a
+        return bound
+
+    def extra_arrays(self):
+        return (self.landmarks, self.distances)
@@ -0,0 +1,249 @@
+"""Streaming conversion of node and edge files into a map file.
+
+helpers.load_map_graph wants the whole map as one Python dict and builds a
+networkx graph from it, which does not fit in memory for country-scale road
+extracts. build_map_file instead reads a node file and an edge file row by
+row and writes the CompactMap arrays straight into a preallocated,
+memory-mapped map file:
+
+    1. count the nodes and the roads of every node (one pass over each file)
+    2. lay out the file with compact_map.layout_sections and map it
+    3. write the coordinates, then drop every road into its node's slot
+    4. remove duplicate roads node by node and shrink the edge sections
+
+Apart from the mapping itself, memory is a few bytes per node; edges are
+never held in memory. The result opens with CompactMap.open or
+helpers.load_map_file like any saved map.
+
+Files are CSV with a header row, or line-delimited JSON with one object (or
+list) per line, chosen by extension; a trailing .gz is decompressed on the
+fly. Nodes need the columns id, x and y, edges source and target and
+optionally length, the road cost; without it costs are straight-line
+lengths. Node ids must be 0..n-1, in any order.
+
+    python map_loader.py nodes.csv edges.csv country.map
+"""
+import argparse
+from array import array
+import csv
+import gzip
+import io
+import json
+import math
+import mmap
+import sys
+
+from compact_map import layout_sections, shrink_section
+
+NODE_FIELDS = ("id", "x", "y")
+EDGE_FIELDS = ("source", "target", "length")
+_NEIGHBORS_SECTION = 3
+_LENGTHS_SECTION = 4
+
+
+def read_rows(filename, fields, required=None):
+    """Yield one tuple of values per row of a CSV or JSON lines file.
+
+    Values follow fields; missing optional fields are None. required is the
+    number of leading fields every row must have (default: all of them)."""
+    required = len(fields) if required is None else required
+    name = filename[:-3] if filename.endswith(".gz") else filename
+    opener = gzip.open if filename.endswith(".gz") else io.open
+    with opener(filename, 'rt', newline='') as f:
+        if name.endswith((".jsonl", ".ndjson", ".json")):
+            rows = _json_rows(f, fields)
+        else:
+            rows = _csv_rows(f, fields, required)
+        for row in rows:
+            if any(value is None for value in row[:required]):
+                raise ValueError("%s: row %r lacks one of %s" % (filename, row, ", ".join(fields[:required])))
+            yield row
+
+
+def _csv_rows(f, fields, required):
+    reader = csv.reader(f)
+    header = [column.strip() for column in next(reader, [])]
+    missing = [field for field in fields[:required] if field not in header]
+    if missing:
+        raise ValueError("CSV header lacks columns: %s" % ", ".join(missing))
+    columns = [header.index(field) if field in header else None for field in fields]
+    for record in reader:
+        if record:
+            yield tuple(record[column] if column is not None and record[column] != "" else None
+                        for column in columns)
+
+
+def _json_rows(f, fields):
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        if isinstance(record, dict):
+            yield tuple(record.get(field) for field in fields)
+        else:
+            yield tuple(record) + (None,) * (len(fields) - len(record))
+
+
+def build_map_file(nodes_file, edges_file, map_file, symmetric=True, coord_typecode="d",
+                   chunk_size=100000, progress=None):
+    """Convert a node file and an edge file into a map file without loading them whole.
+
+    With symmetric=True every road can be travelled both ways, as with
+    load_map_graph; otherwise each edge row is a one-way road from source
+    to target and the map is marked directed, which the engines that need
+    two-way roads refuse. Duplicate roads are dropped, keeping the cheapest.
+
+    progress, if given, is called as progress(phase, rows_done, total)
+    every chunk_size rows and at the end of each phase; total is None
+    while it is still unknown. Returns (number of nodes, number of roads)."""
+    def report(phase, done, total, final=False):
+        # the closing call of a phase only reports what a chunk did not
+        if progress is not None and ((done % chunk_size != 0 or done == 0) if final else done % chunk_size == 0):
+            progress(phase, done, total)
+
+    # pass 1: how many nodes, and how many roads leave each of them
+    num_nodes = 0
+    max_id = -1
+    for row in read_rows(nodes_file, NODE_FIELDS):
+        max_id = max(max_id, int(row[0]))
+        num_nodes += 1
+        report("counting nodes", num_nodes, None)
+    report("counting nodes", num_nodes, None, final=True)
+    if max_id + 1 != num_nodes:
+        raise ValueError("%s: node ids must be numbered 0..%d" % (nodes_file, num_nodes - 1))
+    degrees = array('q', bytes(8 * (num_nodes + 1)))
+    num_rows = 0
+    for row in read_rows(edges_file, EDGE_FIELDS, required=2):
+        source, target = _edge_nodes(row, num_nodes, edges_file)
+        degrees[source + 1] += 1
+        if symmetric:
+            degrees[target + 1] += 1
+        num_rows += 1
+        report("counting edges", num_rows, None)
+    report("counting edges", num_rows, None, final=True)
+    for node in range(num_nodes):
+        degrees[node + 1] += degrees[node]
+    capacity = degrees[num_nodes]
+
+    specs = [("xs", coord_typecode, num_nodes), ("ys", coord_typecode, num_nodes), ("offsets", 'q', num_nodes + 1),
+             ("neighbors", 'i', capacity), ("lengths", coord_typecode, capacity), ("heuristic_scale", 'd', 1),
+             ("directed", 'b', 1)]
+    header, section_offsets, size = layout_sections(specs)
+    with open(map_file, 'w+b') as f:
+        f.truncate(size)
+        mapped = mmap.mmap(f.fileno(), size)
+    base = memoryview(mapped)
+    views = [base[offset:offset + count * array(typecode).itemsize].cast(typecode)
+             for (_, typecode, count), offset in zip(specs, section_offsets)]
+    xs, ys, offsets, neighbors, lengths, scale, directed = views
+    try:
+        base[:len(header)] = header
+        directed[0] = 0 if symmetric else 1
+        offsets[:] = degrees
+        del degrees
+
+        # pass 2: coordinates go to their slots, roads to the next free place of their node
+        seen = bytearray(num_nodes)
+        done = 0
+        for node, x, y in read_rows(nodes_file, NODE_FIELDS):
+            node = int(node)
+            if not 0 <= node < num_nodes:
+                raise ValueError("%s: node id %d is not in 0..%d" % (nodes_file, node, num_nodes - 1))
+            if seen[node]:
+                raise ValueError("%s: node %d is listed twice" % (nodes_file, node))
+            seen[node] = 1
+            xs[node] = float(x)
+            ys[node] = float(y)
+            done += 1
+            report("nodes", done, num_nodes)
+        report("nodes", done, num_nodes, final=True)
+        del seen
+
+        # offsets[node] serves as the fill cursor of node; once every road is
+        # placed it has moved on to the start of node + 1
+        heuristic_scale = float('inf')
+        done = 0
+        for row in read_rows(edges_file, EDGE_FIELDS, required=2):
+            source, target = _edge_nodes(row, num_nodes, edges_file)
+            straight = math.sqrt((xs[target] - xs[source])**2 + (ys[target] - ys[source])**2)
+            if row[2] is not None:
+                length = float(row[2])
+                if straight > 0:
+                    heuristic_scale = min(heuristic_scale, length / straight)
+            else:
+                length = straight
+                if straight > 0:
+                    heuristic_scale = min(heuristic_scale, 1.0)
+            for node, con_node in ((source, target), (target, source)) if symmetric else ((source, target),):
+                position = offsets[node]
+                neighbors[position] = con_node
+                lengths[position] = length
+                offsets[node] = position + 1
+            done += 1
+            report("edges", done, num_rows)
+        report("edges", done, num_rows, final=True)
+        for node in range(num_nodes, 0, -1):
+            offsets[node] = offsets[node - 1]
+        offsets[0] = 0
+
+        # duplicates can only sit within one node's slice; squeeze them out
+        # while moving every slice down over the gaps
+        write = 0
+        for node in range(num_nodes):
+            begin, end = offsets[node], offsets[node + 1]
+            offsets[node] = write
+            slots = {}
+            for position in range(begin, end):
+                con_node, length = neighbors[position], lengths[position]
+                slot = slots.get(con_node)
+                if slot is None:
+                    slots[con_node] = write
+                    neighbors[write] = con_node
+                    lengths[write] = length
+                    write += 1
+                elif length < lengths[slot]:
+                    lengths[slot] = length
+            report("duplicates", node + 1, num_nodes)
+        offsets[num_nodes] = write
+        report("duplicates", num_nodes, num_nodes, final=True)
+        shrink_section(base, _NEIGHBORS_SECTION, write)
+        shrink_section(base, _LENGTHS_SECTION, write)
+        scale[0] = heuristic_scale if heuristic_scale != float('inf') else 1.0
+        mapped.flush()
+    finally:
+        for view in views:
+            view.release()
+        base.release()
+        mapped.close()
+    return num_nodes, write
+
+
+def _edge_nodes(row, num_nodes, filename):
+    source, target = int(row[0]), int(row[1])
+    if not (0 <= source < num_nodes and 0 <= target < num_nodes):
+        raise ValueError("%s: edge %d-%d refers to an unknown node" % (filename, source, target))
+    return source, target
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert node and edge files into a map file")
+    parser.add_argument("nodes_file")
+    parser.add_argument("edges_file")
+    parser.add_argument("map_file")
+    parser.add_argument("--directed", action="store_true", help="edges are one-way roads")
+    parser.add_argument("--float32", action="store_true", help="store coordinates and costs as float32")
+    parser.add_argument("--chunk-size", type=int, default=100000)
+    args = parser.parse_args()
+
+    def progress(phase, done, total):
+        sys.stderr.write("%-16s %12d%s\n" % (phase, done, " / %d" % total if total is not None else ""))
+
+    nodes, roads = build_map_file(args.nodes_file, args.edges_file, args.map_file, symmetric=not args.directed,
+                                  coord_typecode="f" if args.float32 else "d", chunk_size=args.chunk_size,
+                                  progress=progress)
+    print("%s: %d nodes, %d roads" % (args.map_file, nodes, roads))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Connected components and a partition heuristic.
+
+ComponentIndex labels every intersection with its connected component.
+Two nodes with different labels have no route between them, so a
+PathPlanner given the index answers such queries without searching,
+instead of exploring the whole component of the start first:
+
+    PathPlanner(M, 0, 8, components=ComponentIndex.build(M))
+
+PartitionTable splits the map into 2**levels cells by recursive bisection
+of the coordinates, so the cells of one level are split in two at the
+next. For every cell T it stores, per node v, the road distance from v to
+the boundary of T, i.e. to the nearest node of T with a road leaving T.
+Any route into T passes a boundary node first, so
+
+    h(v) = dist(v, boundary(T))   for v outside T, 0 inside
+
+is a lower bound on the cost from v to any target in T. It is a distance
+to a fixed set of nodes, hence consistent, and it costs one table read per
+node. The table has one multi-source Dijkstra per cell to build and is
+stored node-major like the landmark table, n * 2**levels values.
+
+Both are MapTables, saved with the map they are attached to.
+"""
+from array import array
+from collections import deque
+import heapq
+
+from compact_map import MapTable, require_two_way
+
+
+class ComponentIndex(MapTable):
+    """Connected component label of every node"""
+    EXTRA_NAMES = ("cc.labels",)
+
+    def __init__(self, labels):
+        self.labels = labels
+        self.count = max(labels) + 1 if len(labels) else 0
+
+    @classmethod
+    def build(cls, M):
+        """Label the components of M by breadth-first search"""
+        require_two_way(M, "ComponentIndex")
+        n = len(M.intersections)
+        labels = array('i', [-1]) * n
+        count = 0
+        for root in range(n):
+            if labels[root] != -1:
+                continue
+            labels[root] = count
+            queue = deque([root])
+            while queue:
+                node = queue.popleft()
+                for con_node in M.roads[node]:
+                    if labels[con_node] == -1:
+                        labels[con_node] = count
+                        queue.append(con_node)
+            count += 1
+        return cls(labels)
+
+    def connected(self, node, target):
+        """True if target can be reached from node"""
+        return self.labels[node] == self.labels[target]
+
+    def extra_arrays(self):
+        return (self.labels,)
+
+
+class PartitionTable(MapTable):
+    """Cell of every node and its distances to the boundary of every cell.
+
+    distances[v * k + c] is the road distance from node v to the boundary
+    of cell c, for k = 2**levels cells."""
+    EXTRA_NAMES = ("part.cells", "part.distances")
+
+    def __init__(self, cells, distances):
+        self.cells = cells
+        self.distances = distances
+        if not len(cells) or len(distances) % len(cells):
+            raise ValueError("distances must hold one row per node")
+        self.k = len(distances) // len(cells)
+        self.levels = self.k.bit_length() - 1
+        if 1 << self.levels != self.k:
+            raise ValueError("the number of cells must be a power of two, got %d" % self.k)
+
+    @classmethod
+    def build(cls, M, levels=6):
+        """Partition M into 2**levels cells and compute the boundary distance table"""
+        require_two_way(M, "PartitionTable")
+        n = len(M.intersections)
+        if levels < 0 or (1 << levels) > n:
+            raise ValueError("levels must be between 0 and log2 of the number of nodes, got %r" % levels)
+        k = 1 << levels
+        xs = [M.intersections[node][0] for node in range(n)]
+        ys = [M.intersections[node][1] for node in range(n)]
+        cells = array('i', bytes(4 * n))
+        # bisect each cell along its wider side; cell c of a level becomes
+        # cells 2c and 2c + 1 of the next, so coarser cells are id prefixes
+        groups = [list(range(n))]
+        for _ in range(levels):
+            split = []
+            for nodes in groups:
+                spread_x = max(xs[node] for node in nodes) - min(xs[node] for node in nodes)
+                spread_y = max(ys[node] for node in nodes) - min(ys[node] for node in nodes)
+                nodes.sort(key=xs.__getitem__ if spread_x >= spread_y else ys.__getitem__)
+                split.append(nodes[:len(nodes) // 2])
+                split.append(nodes[len(nodes) // 2:])
+            groups = split
+        for cell, nodes in enumerate(groups):
+            for node in nodes:
+                cells[node] = cell
+
+        distances = array('d', bytes(8 * n * k))
+        for cell in range(k):
+            boundary = [node for node in groups[cell]
+                        if any(cells[con_node] != cell for con_node in M.roads[node])]
+            distances[cell::k] = array('d', _multi_source_dijkstra(M, boundary))
+        return cls(cells, distances)
+
+    def cell(self, node, level=None):
+        """Cell of node at level (default: the finest); level 0 is the whole map"""
+        level = self.levels if level is None else level
+        return self.cells[node] >> (self.levels - level)
+
+    def lower_bound(self, node, target):
+        """Lower bound on the road distance from node to target"""
+        cell = self.cells[target]
+        if self.cells[node] == cell:
+            return 0.0
+        return self.distances[node * self.k + cell]
+
+    def extra_arrays(self):
+        return (self.cells, self.distances)
+
+
+def _multi_source_dijkstra(M, sources):
+    """Distance from every node to the nearest of sources"""
+    dist = [float('inf')] * len(M.intersections)
+    heap = []
+    for source in sources:
+        dist[source] = 0.0
+        heap.append((0.0, source))
+    heapq.heapify(heap)
+    while heap:
+        d, node = heapq.heappop(heap)
+        if d > dist[node]:
+            continue
+        for con_node, length in zip(M.roads[node], M.road_lengths[node]):
+            if d + length < dist[con_node]:
+                dist[con_node] = d + length
+                heapq.heappush(heap, (d + length, con_node))
+    return dist
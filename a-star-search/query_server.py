@@ -0,0 +1,107 @@
+"""Process-pool executor for batched path queries.
+
+Path search is CPU-bound pure Python, so queries are spread over worker
+processes rather than threads. Every worker opens the same map file saved by
+Map.save / CompactMap.save; the file is memory-mapped read-only, so the map
+is never pickled to the workers and all of them share one page-cache copy.
+A landmark table or other extras saved with the map come along for free.
+
+Queries are cut into batches; each batch is answered by one
+PathPlanner.search_many call in a worker, which reuses its search buffers.
+At most max_pending batches are in flight at a time, so a huge or endless
+stream of queries does not pile up in memory.
+
+    with QueryExecutor("city.map", workers=8) as executor:
+        for start, goal, path, cost in executor.map(pairs, ordered=False):
+            ...
+"""
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import importlib
+import itertools
+import os
+
+from compact_map import CompactMap
+from landmarks import LandmarkTable
+
+_planner = None     # per worker process
+_flags = None
+
+
+def init_worker(map_file, flags=None):
+    """Pool initializer: open map_file and make the worker's planner.
+
+    flags is an optional shared array of cancel flags for run_cancellable."""
+    global _planner, _flags
+    PathPlanner = importlib.import_module("a-star").PathPlanner
+    M = CompactMap.open(map_file)
+    _planner = PathPlanner(M, heuristic=LandmarkTable.from_map(M))
+    _flags = flags
+
+
+def _run_batch(pairs):
+    paths, costs = _planner.search_many(pairs)
+    return pairs, paths, costs
+
+
+def run_cancellable(start, goal, slot):
+    """Run one search in a worker; returns None when it was cancelled through flags[slot]"""
+    SearchCancelled = importlib.import_module("a-star").SearchCancelled
+    try:
+        paths, costs = _planner.search_many([(start, goal)], should_stop=lambda: _flags[slot])
+    except SearchCancelled:
+        return None
+    return paths[0], costs[0]
+
+
+class QueryExecutor(object):
+    """Answer (start, goal) queries on a map file with a pool of processes"""
+    def __init__(self, map_file, workers=None, batch_size=256, max_pending=None, mp_context=None):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.map_file = map_file
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.max_pending = max_pending or 2 * self.workers
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=mp_context,
+                                         initializer=init_worker, initargs=(map_file,))
+
+    def submit(self, pairs):
+        """Submit one batch, returns a Future of (pairs, paths, costs)"""
+        return self._pool.submit(_run_batch, list(pairs))
+
+    def map(self, pairs, ordered=True):
+        """Yield (start, goal, path, cost) for every query in pairs.
+
+        pairs may be any iterable, including a generator; it is consumed
+        only as fast as the workers keep up. With ordered=False results are
+        yielded batch by batch as soon as they are ready."""
+        pairs = iter(pairs)
+        pending = deque() if ordered else set()
+        while True:
+            while len(pending) < self.max_pending:
+                batch = list(itertools.islice(pairs, self.batch_size))
+                if not batch:
+                    break
+                future = self.submit(batch)
+                pending.append(future) if ordered else pending.add(future)
+            if not pending:
+                return
+            if ordered:
+                done = [pending.popleft()]
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                pending -= done
+            for future in done:
+                batch, paths, costs = future.result()
+                for (start, goal), path, cost in zip(batch, paths, costs):
+                    yield start, goal, path, cost
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
@@ -0,0 +1,118 @@
+"""Bounded LRU cache of computed routes.
+
+Routes are keyed on (map token, start, goal). Every map gets a token the
+first time it is seen; the token is never reused, and entries for a map are
+dropped when the map is garbage collected or explicitly invalidated, e.g.
+when PathPlanner.set_map swaps it out. A map can also carry a version
+attribute; bumping it makes older entries unreachable until they age out.
+
+Any stretch of a shortest path is itself a shortest path, so a stored route
+also answers queries whose start and goal both lie on it, in the direction
+of the stored route, and in the other direction too unless the map is
+directed, i.e. has one-way roads.
+"""
+from collections import OrderedDict
+import itertools
+import weakref
+
+
+class RouteCache(object):
+    """LRU cache of (path, cost) results with hit and miss counters"""
+    def __init__(self, maxsize=1024):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.subpath_hits = 0
+        self.misses = 0
+        self._routes = OrderedDict()    # key -> (path, prefix costs, {node: index})
+        self._by_node = {}              # (map key, node) -> keys of routes through node
+        self._tokens = weakref.WeakKeyDictionary()
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._routes)
+
+    def map_key(self, M):
+        """Return the key identifying M's current version in this cache"""
+        token = self._tokens.get(M)
+        if token is None:
+            token = self._tokens[M] = next(self._counter)
+            weakref.finalize(M, self._drop_token, token)
+        return (token, getattr(M, 'version', 0))
+
+    def get(self, M, start, goal):
+        """Return the cached (path, cost) from start to goal on M, or None"""
+        map_key = self.map_key(M)
+        key = (map_key, start, goal)
+        entry = self._routes.get(key)
+        if entry is not None:
+            self._routes.move_to_end(key)
+            self.hits += 1
+            path, prefix, _ = entry
+            return (list(path), prefix[-1]) if path is not None else (None, float('inf'))
+        candidates = self._by_node.get((map_key, start), set()) & self._by_node.get((map_key, goal), set())
+        two_way = not getattr(M, 'directed', False)
+        for key in candidates:
+            path, prefix, positions = self._routes[key]
+            i, j = positions[start], positions[goal]
+            if i > j and not two_way:
+                continue
+            self._routes.move_to_end(key)
+            self.hits += 1
+            self.subpath_hits += 1
+            if i <= j:
+                return path[i:j + 1], prefix[j] - prefix[i]
+            return path[j:i + 1][::-1], prefix[i] - prefix[j]
+        self.misses += 1
+        return None
+
+    def put(self, M, start, goal, path, prefix_costs=None):
+        """Store a route; prefix_costs[i] is the cost from start to path[i].
+
+        A path of None records that goal is unreachable from start."""
+        map_key = self.map_key(M)
+        key = (map_key, start, goal)
+        if key in self._routes:
+            self._discard(key)
+        if path is None:
+            self._routes[key] = (None, [float('inf')], {})
+        else:
+            path = list(path)
+            positions = {}
+            for index, node in enumerate(path):
+                positions.setdefault(node, index)
+                self._by_node.setdefault((map_key, node), set()).add(key)
+            self._routes[key] = (path, list(prefix_costs), positions)
+        while len(self._routes) > self.maxsize:
+            self._discard(next(iter(self._routes)))
+
+    def invalidate(self, M=None):
+        """Drop every route computed on M, or everything when M is None"""
+        if M is None:
+            self._routes.clear()
+            self._by_node.clear()
+            return
+        token = self._tokens.get(M)
+        if token is not None:
+            self._drop_token(token)
+
+    def stats(self):
+        """Return the counters and current size as a dict"""
+        lookups = self.hits + self.misses
+        return {'size': len(self._routes), 'maxsize': self.maxsize, 'hits': self.hits,
+                'subpath_hits': self.subpath_hits, 'misses': self.misses,
+                'hit_rate': self.hits / float(lookups) if lookups else 0.0}
+
+    def _drop_token(self, token):
+        for key in [key for key in self._routes if key[0][0] == token]:
+            self._discard(key)
+
+    def _discard(self, key):
+        path, _, positions = self._routes.pop(key)
+        for node in positions:
+            keys = self._by_node.get((key[0], node))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_node[(key[0], node)]
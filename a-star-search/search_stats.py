@@ -0,0 +1,112 @@
+"""Opt-in instrumentation of path searches.
+
+Pass a SearchStats to PathPlanner(stats=...) and every query it runs,
+through run_search, search_many or distance_matrix, is recorded as a
+QueryStats:
+
+    expanded      nodes taken off the open set and closed
+    relaxed       roads looked at from expanded nodes
+    heap_pushes   entries pushed on the priority queue, stale ones included
+    heap_pops     entries popped, stale ones included
+    open_peak     largest open set seen, sampled at every expansion
+    phases        wall time in seconds per phase, e.g. setup, search, path
+
+A distance_matrix row is one query towards many targets: its cost is the
+largest finite distance in the row and reached counts the targets with a
+path, so one unreachable target does not turn the whole row into a miss.
+
+Without a SearchStats the searches only test for it once per expansion.
+
+    stats = SearchStats()
+    planner = PathPlanner(M, stats=stats)
+    planner.search_many(pairs)
+    json.dumps(stats.as_dict())
+    stats.worst("expanded")     # the most expensive recent queries
+"""
+from collections import deque
+import time
+
+COUNTERS = ("expanded", "relaxed", "heap_pushes", "heap_pops", "open_peak")
+
+
+class QueryStats(object):
+    """Counters and phase timings of one query"""
+    __slots__ = ("engine", "start", "goal", "cost", "found", "reached", "phases", "_mark") + COUNTERS
+
+    def __init__(self, engine, start, goal):
+        self.engine = engine
+        self.start = start
+        self.goal = goal
+        self.cost = None
+        self.found = None
+        self.reached = None     # targets with a path, for many-target queries
+        self.phases = {}
+        for counter in COUNTERS:
+            setattr(self, counter, 0)
+        self._mark = time.perf_counter()
+
+    def lap(self, phase):
+        """Charge the time since the previous lap (or since the query began) to phase"""
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self._mark
+        self._mark = now
+
+    @property
+    def elapsed(self):
+        return sum(self.phases.values())
+
+    def as_dict(self):
+        result = {'engine': self.engine, 'start': self.start, 'goal': self.goal, 'found': self.found,
+                  'cost': self.cost if self.found else None, 'reached': self.reached, 'elapsed': self.elapsed,
+                  'phases': dict(self.phases)}
+        for counter in COUNTERS:
+            result[counter] = getattr(self, counter)
+        return result
+
+
+class SearchStats(object):
+    """Collects QueryStats: running totals plus the most recent history queries"""
+    def __init__(self, history=1000):
+        if history < 0:
+            raise ValueError("history must not be negative")
+        self.queries = deque(maxlen=history)
+        self.count = 0
+        self.not_found = 0
+        self.totals = dict.fromkeys(COUNTERS, 0)
+        self.phase_totals = {}
+
+    def begin(self, engine, start, goal):
+        """Start recording a query; the engine fills in the returned QueryStats"""
+        return QueryStats(engine, start, goal)
+
+    def end(self, record, cost):
+        """Finish a query with its path cost (infinity when there is no path)"""
+        record.cost = cost
+        record.found = cost != float('inf')
+        self.count += 1
+        self.not_found += not record.found
+        for counter in COUNTERS:
+            if counter == "open_peak":
+                self.totals[counter] = max(self.totals[counter], record.open_peak)
+            else:
+                self.totals[counter] += getattr(record, counter)
+        for phase, seconds in record.phases.items():
+            self.phase_totals[phase] = self.phase_totals.get(phase, 0.0) + seconds
+        self.queries.append(record)
+
+    def worst(self, key="elapsed", count=10):
+        """Return the count recent queries with the largest key, e.g. "expanded", as dicts"""
+        records = [record.as_dict() for record in self.queries]
+        return sorted(records, key=lambda record: record[key], reverse=True)[:count]
+
+    def as_dict(self):
+        """Export totals and the recent queries as plain JSON-serialisable data"""
+        return {'queries': self.count, 'not_found': self.not_found, 'totals': dict(self.totals),
+                'phases': dict(self.phase_totals), 'recent': [record.as_dict() for record in self.queries]}
+
+    def reset(self):
+        self.queries.clear()
+        self.count = 0
+        self.not_found = 0
+        self.totals = dict.fromkeys(COUNTERS, 0)
+        self.phase_totals = {}
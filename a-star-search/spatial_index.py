@@ -0,0 +1,160 @@
+"""k-d tree over map intersections for snapping raw coordinates to nodes.
+
+Callers usually hold a position, not a node id. KDTree answers "which
+intersection is closest to (x, y)" in O(log n) on average instead of a scan
+over every intersection.
+
+The tree is implicit: order is a permutation of the node ids such that every
+subtree covers a contiguous range of it, with the splitting node in the
+middle of its range and its split axis (0 = x, 1 = y, the wider spread)
+stored at the same position of axes. Ranges of at most leaf_size nodes are
+leaves and are scanned. Three flat arrays, so the tree is a MapTable and
+can be saved with the map like the landmark table:
+
+    index = KDTree.build(M)
+    index.attach(M)
+    M.save("city.map")
+    ...
+    index = KDTree.from_map(M) or KDTree.build(M)
+    start = index.nearest(x, y)
+"""
+from array import array
+import heapq
+
+from compact_map import MapTable
+
+
+class KDTree(MapTable):
+    """Nearest and k-nearest intersection queries over a map's coordinates"""
+    EXTRA_NAMES = ("kd.order", "kd.axes", "kd.leaf_size")
+
+    def __init__(self, M, order, axes, leaf_size):
+        if len(order) != len(M.intersections) or len(axes) != len(order):
+            raise ValueError("order and axes must hold one entry per intersection")
+        if leaf_size < 1:
+            raise ValueError("leaf_size must be at least 1")
+        self.order = order
+        self.axes = axes
+        self.leaf_size = leaf_size
+        # a CompactMap's coordinate arrays are read in place, so a tree
+        # opened with a saved map copies nothing
+        if hasattr(M, 'xs'):
+            self._xs, self._ys = M.xs, M.ys
+        else:
+            self._xs = array('d', (M.intersections[node][0] for node in range(len(order))))
+            self._ys = array('d', (M.intersections[node][1] for node in range(len(order))))
+
+    @classmethod
+    def build(cls, M, leaf_size=16):
+        """Build the tree over every intersection of M"""
+        n = len(M.intersections)
+        xs = [M.intersections[node][0] for node in range(n)]
+        ys = [M.intersections[node][1] for node in range(n)]
+        order = list(range(n))
+        axes = array('b', bytes(n))
+        stack = [(0, n)]
+        while stack:
+            lo, hi = stack.pop()
+            if hi - lo <= leaf_size:
+                continue
+            nodes = order[lo:hi]
+            spread_x = max(xs[node] for node in nodes) - min(xs[node] for node in nodes)
+            spread_y = max(ys[node] for node in nodes) - min(ys[node] for node in nodes)
+            axis = 0 if spread_x >= spread_y else 1
+            nodes.sort(key=xs.__getitem__ if axis == 0 else ys.__getitem__)
+            order[lo:hi] = nodes
+            mid = (lo + hi) // 2
+            axes[mid] = axis
+            stack.append((lo, mid))
+            stack.append((mid + 1, hi))
+        return cls(M, array('i', order), axes, leaf_size)
+
+    def __len__(self):
+        return len(self.order)
+
+    def nearest(self, x, y, hint=None):
+        """Return the intersection closest to (x, y), or None on an empty map.
+
+        hint is a node believed to be close; it only speeds up the search."""
+        if not len(self.order):
+            return None
+        xs, ys, order, axes, leaf_size = self._xs, self._ys, self.order, self.axes, self.leaf_size
+        best = hint if hint is not None else -1
+        best_d = (xs[hint] - x)**2 + (ys[hint] - y)**2 if hint is not None else float('inf')
+        stack = [(0, len(order), 0.0)]
+        while stack:
+            lo, hi, bound = stack.pop()
+            if bound >= best_d:
+                continue
+            if hi - lo <= leaf_size:
+                for node in order[lo:hi]:
+                    d = (xs[node] - x)**2 + (ys[node] - y)**2
+                    if d < best_d:
+                        best, best_d = node, d
+                continue
+            mid = (lo + hi) // 2
+            node = order[mid]
+            d = (xs[node] - x)**2 + (ys[node] - y)**2
+            if d < best_d:
+                best, best_d = node, d
+            diff = x - xs[node] if axes[mid] == 0 else y - ys[node]
+            # the far side is pushed first so the near side is searched first
+            if diff < 0:
+                stack.append((mid + 1, hi, max(bound, diff * diff)))
+                stack.append((lo, mid, bound))
+            else:
+                stack.append((lo, mid, max(bound, diff * diff)))
+                stack.append((mid + 1, hi, bound))
+        return best
+
+    def k_nearest(self, x, y, k):
+        """Return up to k intersections closest to (x, y), closest first"""
+        if k < 1:
+            return []
+        xs, ys, order, axes, leaf_size = self._xs, self._ys, self.order, self.axes, self.leaf_size
+        heap = []       # (-squared distance, node), the farthest of the best k on top
+        stack = [(0, len(order), 0.0)]
+        while stack:
+            lo, hi, bound = stack.pop()
+            if len(heap) == k and bound >= -heap[0][0]:
+                continue
+            if hi - lo <= leaf_size:
+                candidates = order[lo:hi]
+            else:
+                mid = (lo + hi) // 2
+                node = order[mid]
+                candidates = (node,)
+                diff = x - xs[node] if axes[mid] == 0 else y - ys[node]
+                if diff < 0:
+                    stack.append((mid + 1, hi, max(bound, diff * diff)))
+                    stack.append((lo, mid, bound))
+                else:
+                    stack.append((lo, mid, max(bound, diff * diff)))
+                    stack.append((mid + 1, hi, bound))
+            for node in candidates:
+                d = (xs[node] - x)**2 + (ys[node] - y)**2
+                if len(heap) < k:
+                    heapq.heappush(heap, (-d, node))
+                elif d < -heap[0][0]:
+                    heapq.heapreplace(heap, (-d, node))
+        return [node for _, node in sorted(heap, key=lambda entry: (-entry[0], entry[1]))]
+
+    def nearest_many(self, points):
+        """Snap every (x, y) in points to its closest intersection.
+
+        Each answer seeds the search for the next point, so batches of
+        nearby points, such as the samples of one GPS trace, are cheap."""
+        nodes = []
+        hint = None
+        for x, y in points:
+            hint = self.nearest(x, y, hint)
+            nodes.append(hint)
+        return nodes
+
+    def extra_arrays(self):
+        return (self.order, self.axes, array('i', [self.leaf_size]))
+
+    @classmethod
+    def from_extras(cls, M, arrays):
+        order, axes, leaf_size = arrays
+        return cls(M, order, axes, leaf_size[0])
@@ -0,0 +1,56 @@
+"""Shared fixtures for the search engine tests.
+
+The engines are plain modules next to this directory, and a-star.py is only
+importable by name through importlib. Results are checked against networkx's
+Dijkstra on the same graphs."""
+import contextlib
+import importlib
+import io
+import os
+import sys
+
+import networkx as nx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+with contextlib.redirect_stdout(io.StringIO()):     # plotly's notebook setup prints on import
+    import helpers
+
+astar = importlib.import_module("a-star")
+
+
+def to_networkx(M):
+    """Directed networkx graph of any map's roads, with their costs as 'length'"""
+    G = nx.DiGraph()
+    G.add_nodes_from(range(len(M.intersections)))
+    for node in range(len(M.intersections)):
+        for con_node, length in zip(M.roads[node], M.road_lengths[node]):
+            G.add_edge(node, con_node, length=length)
+    return G
+
+
+def dijkstra_costs(G, source):
+    """Shortest path cost from source to every node of G, infinity if unreachable"""
+    reached = nx.single_source_dijkstra_path_length(G, source, weight='length')
+    return [reached.get(node, float('inf')) for node in range(len(G))]
+
+
+def path_cost(G, path):
+    """Cost of path in G; fails if it uses a road G does not have"""
+    return nx.path_weight(G, path, 'length')
+
+
+@pytest.fixture
+def map_40():
+    return helpers.load_map_40()
+
+
+@pytest.fixture
+def graph_40(map_40):
+    """map_40's networkx graph with the road lengths as edge weights"""
+    G = map_40._graph.copy()
+    for node in range(len(map_40.roads)):
+        for con_node, length in zip(map_40.roads[node], map_40.road_lengths[node]):
+            G[node][con_node]['length'] = length
+    return G
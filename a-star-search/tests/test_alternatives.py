@@ -0,0 +1,30 @@
+import itertools
+
+import networkx as nx
+import pytest
+
+import helpers
+from alternatives import AlternativeRoutes
+from conftest import path_cost
+
+
+@pytest.mark.parametrize("start, goal", [(5, 34), (2, 15), (8, 24), (0, 38), (13, 23)])
+def test_k_shortest_match_networkx(map_40, graph_40, start, goal):
+    k = 6
+    routes = AlternativeRoutes(map_40).search(start, goal, k=k)
+    expected = [path_cost(graph_40, path)
+                for path in itertools.islice(nx.shortest_simple_paths(graph_40, start, goal, weight='length'), k)]
+    assert [cost for _, cost in routes] == pytest.approx(expected)
+    assert len(set(tuple(path) for path, _ in routes)) == k
+    for path, cost in routes:
+        assert path[0] == start and path[-1] == goal
+        assert len(set(path)) == len(path)
+        assert path_cost(graph_40, path) == pytest.approx(cost)
+
+
+def test_fewer_routes_than_asked():
+    M = helpers.load_map_10()
+    assert AlternativeRoutes(M).search(8, 9, k=3) == [([8, 9], pytest.approx(M.road_lengths[8][0]))]
+    assert AlternativeRoutes(M).search(0, 9, k=3) == []
+    with pytest.raises(ValueError):
+        AlternativeRoutes(M).search(0, 1, k=0)
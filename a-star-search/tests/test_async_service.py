@@ -0,0 +1,25 @@
+import asyncio
+
+import helpers
+from async_service import AsyncRouter
+from compact_map import CompactMap
+from conftest import astar
+
+
+def test_routes_match_path_planner_and_coalesce(tmp_path):
+    map_file = str(tmp_path / "map_40.map")
+    M = CompactMap.from_map_dict(helpers.map_40_dict)
+    M.save(map_file)
+    pairs = [(2, 15), (5, 34), (2, 15), (8, 24), (2, 15)]
+
+    async def run():
+        async with AsyncRouter(map_file, workers=1, max_in_flight=2) as router:
+            results = await asyncio.gather(*[router.route(start, goal) for start, goal in pairs])
+            return results, router.metrics()
+
+    results, metrics = asyncio.run(run())
+    for (start, goal), (path, cost) in zip(pairs, results):
+        assert path == astar.PathPlanner(M, start, goal, open_set="heap").path
+    assert metrics['coalesced'] == 2
+    assert metrics['completed'] == 3
+    assert metrics['queue_depth'] == metrics['running'] == 0
@@ -0,0 +1,69 @@
+import pytest
+
+from conftest import astar
+from alternatives import AlternativeRoutes
+from compact_map import CompactMap
+from contraction import ContractionHierarchy
+from landmarks import LandmarkTable
+from map_loader import build_map_file
+from partition import ComponentIndex, PartitionTable
+from route_cache import RouteCache
+
+# one-way ring 0 -> 1 -> 2 -> 3 -> 0 with a spur 2 -> 4
+NODES = [(0, 0.0, 0.0), (1, 1.0, 0.0), (2, 1.0, 1.0), (3, 0.0, 1.0), (4, 2.0, 1.0)]
+EDGES = [(0, 1), (1, 2), (2, 3), (3, 0), (2, 4)]
+
+
+def write_csv(path, header, rows):
+    path.write_text("\n".join([",".join(header)] + [",".join(str(value) for value in row) for row in rows]) + "\n")
+    return str(path)
+
+
+@pytest.fixture
+def one_way_map(tmp_path):
+    nodes = write_csv(tmp_path / "nodes.csv", ("id", "x", "y"), NODES)
+    edges = write_csv(tmp_path / "edges.csv", ("source", "target"), EDGES)
+    build_map_file(nodes, edges, str(tmp_path / "one_way.map"), symmetric=False)
+    M = CompactMap.open(str(tmp_path / "one_way.map"))
+    yield M
+    M.close()
+
+
+def test_directed_flag_is_saved(one_way_map, tmp_path):
+    assert one_way_map.directed
+    assert list(one_way_map.roads[1]) == [2]
+    CompactMap.from_map(one_way_map).save(str(tmp_path / "copy.map"))
+    with CompactMap.open(str(tmp_path / "copy.map")) as M:
+        assert M.directed
+
+
+def test_astar_follows_one_way_roads(one_way_map):
+    assert astar.PathPlanner(one_way_map, 2, 1, open_set="heap").path == [2, 3, 0, 1]
+
+
+@pytest.mark.parametrize("build", [
+    lambda M: astar.PathPlanner(M, 2, 1, bidirectional=True),
+    lambda M: astar.IncrementalPlanner(M, 2, 1),
+    lambda M: LandmarkTable.build(M, count=2),
+    lambda M: ContractionHierarchy.build(M),
+    lambda M: ComponentIndex.build(M),
+    lambda M: PartitionTable.build(M, levels=1),
+    lambda M: AlternativeRoutes(M),
+])
+def test_two_way_engines_refuse_directed_maps(one_way_map, build):
+    with pytest.raises(ValueError, match="two-way"):
+        build(one_way_map)
+
+
+def test_route_cache_does_not_reverse_one_way_routes(one_way_map):
+    cache = RouteCache()
+    cache.put(one_way_map, 0, 2, [0, 1, 2], [0.0, 1.0, 2.0])
+    assert cache.get(one_way_map, 0, 1) == ([0, 1], 1.0)
+    assert cache.get(one_way_map, 1, 0) is None
+
+
+def test_loader_rejects_negative_node_ids(tmp_path):
+    nodes = write_csv(tmp_path / "nodes.csv", ("id", "x", "y"), [(-2, 5.0, 5.0), (1, 1.0, 0.0)])
+    edges = write_csv(tmp_path / "edges.csv", ("source", "target"), [(1, 1)])
+    with pytest.raises(ValueError, match="not in 0..1"):
+        build_map_file(nodes, edges, str(tmp_path / "bad.map"))
@@ -0,0 +1,119 @@
+"""Every exact engine against networkx Dijkstra on the same map."""
+import random
+
+import pytest
+
+from benchmark import geometric_map_dict, grid_map_dict
+from compact_map import CompactMap
+from conftest import astar, dijkstra_costs, path_cost, to_networkx
+from contraction import ContractionHierarchy
+from landmarks import LandmarkTable
+from partition import ComponentIndex, PartitionTable
+from search_stats import SearchStats
+from vector_search import VectorPlanner, np
+
+INF = float('inf')
+
+
+@pytest.fixture(scope="module", params=["map_40", "geometric", "grid"])
+def case(request):
+    """(map, networkx graph, query pairs, exact costs); the grid has unreachable pairs"""
+    import helpers
+    M = {"map_40": lambda: CompactMap.from_map_dict(helpers.map_40_dict),
+         "geometric": lambda: CompactMap.from_map_dict(geometric_map_dict(300, seed=1)),
+         "grid": lambda: CompactMap.from_map_dict(grid_map_dict(300, seed=2, closed=0.4))}[request.param]()
+    G = to_networkx(M)
+    rng = random.Random(0)
+    pairs = [(rng.randrange(M.num_nodes), rng.randrange(M.num_nodes)) for _ in range(60)]
+    costs = {source: dijkstra_costs(G, source) for source in set(start for start, _ in pairs)}
+    return M, G, pairs, [costs[start][goal] for start, goal in pairs]
+
+
+def check(G, start, goal, path, expected, cost=None):
+    if expected == INF:
+        assert not path
+        assert cost in (None, INF)
+        return
+    assert path[0] == start and path[-1] == goal
+    assert path_cost(G, path) == pytest.approx(expected)
+    if cost is not None:
+        assert cost == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("options", [
+    dict(open_set="set"),
+    dict(open_set="heap"),
+    dict(bidirectional=True),
+])
+def test_path_planner(case, options):
+    M, G, pairs, expected = case
+    for (start, goal), cost in zip(pairs, expected):
+        check(G, start, goal, astar.PathPlanner(M, start, goal, **options).path, cost)
+
+
+def test_bidirectional_expands_fewer_nodes(map_40):
+    def expanded(M, pairs, **options):
+        stats = SearchStats()
+        for start, goal in pairs:
+            astar.PathPlanner(M, start, goal, stats=stats, **options)
+        return stats.totals["expanded"]
+    # 11 -> 8 is one of the longest routes on map_40
+    assert expanded(map_40, [(11, 8)], bidirectional=True) < expanded(map_40, [(11, 8)], open_set="heap")
+    M = CompactMap.from_map_dict(geometric_map_dict(1000, seed=3))
+    rng = random.Random(0)
+    pairs = [(rng.randrange(M.num_nodes), rng.randrange(M.num_nodes)) for _ in range(50)]
+    assert expanded(M, pairs, bidirectional=True) < expanded(M, pairs, open_set="heap")
+
+
+@pytest.mark.parametrize("build", [
+    lambda M: dict(heuristic=LandmarkTable.build(M, count=4)),
+    lambda M: dict(heuristic=LandmarkTable.build(M, count=4, strategy="avoid")),
+    lambda M: dict(heuristic=PartitionTable.build(M, levels=3)),
+    lambda M: dict(components=ComponentIndex.build(M)),
+])
+def test_path_planner_with_preprocessing(case, build):
+    M, G, pairs, expected = case
+    options = build(M)
+    for (start, goal), cost in zip(pairs, expected):
+        check(G, start, goal, astar.PathPlanner(M, start, goal, open_set="heap", **options).path, cost)
+
+
+def test_search_many_and_distance_matrix(case):
+    M, G, pairs, expected = case
+    planner = astar.PathPlanner(M, heuristic=LandmarkTable.build(M, count=4))
+    paths, costs = planner.search_many(pairs)
+    for (start, goal), path, cost, exact in zip(pairs, paths, costs, expected):
+        check(G, start, goal, path, exact, cost)
+    sources = sorted(set(start for start, _ in pairs))[:5]
+    targets = sorted(set(goal for _, goal in pairs))[:7]
+    for source, row in zip(sources, planner.distance_matrix(sources, targets)):
+        exact = dijkstra_costs(G, source)
+        assert row == pytest.approx([exact[target] for target in targets])
+
+
+def test_weighted_and_anytime(case):
+    M, G, pairs, expected = case
+    for (start, goal), cost in zip(pairs, expected):
+        weighted = astar.PathPlanner(M, start, goal, open_set="heap", weight=2.0)
+        if cost == INF:
+            assert not weighted.path
+            continue
+        assert path_cost(G, weighted.path) <= 2.0 * cost + 1e-9
+        check(G, start, goal, weighted.anytime_search(), cost)
+        assert weighted.suboptimality == pytest.approx(1.0)
+
+
+def test_contraction_hierarchy(case):
+    M, G, pairs, expected = case
+    hierarchy = ContractionHierarchy.build(M)
+    for (start, goal), cost in zip(pairs, expected):
+        path, found = hierarchy.query(start, goal)
+        check(G, start, goal, path, cost, found)
+
+
+@pytest.mark.skipif(np is None, reason="VectorPlanner needs numpy")
+def test_vector_planner(case):
+    M, G, pairs, expected = case
+    paths, costs = VectorPlanner(M).search_many(pairs)
+    for (start, goal), path, cost, exact in zip(pairs, paths, costs, expected):
+        check(G, start, goal, path, exact, cost)
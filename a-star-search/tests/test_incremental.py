@@ -0,0 +1,61 @@
+import random
+
+import networkx as nx
+import pytest
+
+import helpers
+from compact_map import CompactMap
+from conftest import astar
+
+
+def dijkstra_cost(G, start, goal):
+    try:
+        return nx.dijkstra_path_length(G, start, goal, weight='length')
+    except nx.NetworkXNoPath:
+        return float('inf')
+
+
+def path_cost(G, path):
+    return nx.path_weight(G, path, 'length')
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_replan_matches_dijkstra_after_cost_changes(map_40, graph_40, seed):
+    rng = random.Random(seed)
+    start, goal = rng.sample(range(40), 2)
+    planner = astar.IncrementalPlanner(map_40, start, goal)
+    G = graph_40.copy()
+    for _ in range(30):
+        node = rng.randrange(40)
+        neighbor = rng.choice(list(map_40.roads[node]))
+        # costs may rise, close the road, or fall back to the straight line
+        length = map_40.road_lengths[node][list(map_40.roads[node]).index(neighbor)]
+        cost = rng.choice([length, length * rng.uniform(1.0, 4.0), float('inf')])
+        planner.update_edge(node, neighbor, cost)
+        G[node][neighbor]['length'] = cost
+        if rng.random() < 0.3 and planner.path and len(planner.path) > 1:
+            planner.move_start(planner.path[1])
+        path = planner.replan()
+        expected = dijkstra_cost(G, planner.start, goal)
+        if expected == float('inf'):
+            assert path is False
+        else:
+            assert path[0] == planner.start and path[-1] == goal
+            assert abs(path_cost(G, path) - expected) < 1e-9
+
+
+def test_search_state_is_not_shared_with_path_planner_modes(map_40):
+    planner = astar.IncrementalPlanner(map_40, 2, 15)
+    assert not hasattr(planner, 'anytime_search')
+    assert not hasattr(planner, 'run_bidirectional_search')
+    planner.update_edge(2, 39, 5.0)
+    assert planner.replan()[-1] == 15
+
+
+def test_set_map_forgets_cost_changes():
+    planner = astar.IncrementalPlanner(CompactMap.from_map_dict(helpers.map_40_dict), 2, 15)
+    for neighbor in list(planner.map.roads[2]):
+        planner.update_edge(2, neighbor, float('inf'))
+    assert planner.replan() is False
+    path = planner.set_map(CompactMap.from_map_dict(helpers.map_40_dict))
+    assert path == astar.PathPlanner(planner.map, 2, 15).path == [2, 36, 28, 17, 15]
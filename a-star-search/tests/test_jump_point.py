@@ -0,0 +1,41 @@
+import random
+
+import pytest
+
+from conftest import dijkstra_costs, path_cost, to_networkx
+from jump_point import JumpPointPlanner, OccupancyGrid
+
+
+def random_grid(rng, width, height, blocked):
+    return OccupancyGrid.from_rows(["".join("#" if rng.random() < blocked else "." for _ in range(width))
+                                    for _ in range(height)])
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_costs_match_dijkstra_on_the_grid_graph(seed):
+    rng = random.Random(seed)
+    grid = random_grid(rng, 17, 11, 0.3)
+    G = to_networkx(grid.to_compact_map())
+    free = [node for node in range(17 * 11) if not grid.is_blocked(*grid.cell(node))]
+    planner = JumpPointPlanner(grid)
+    for start in rng.sample(free, 5):
+        exact = dijkstra_costs(G, start)
+        for goal in rng.sample(free, 10):
+            path, cost = planner.search(start, goal)
+            if exact[goal] == float('inf'):
+                assert path is None and cost == float('inf')
+                continue
+            assert cost == pytest.approx(exact[goal])
+            # every step is a road of the grid graph, so no corner is cut
+            assert path[0] == start and path[-1] == goal
+            assert path_cost(G, path) == pytest.approx(exact[goal])
+
+
+def test_blocking_a_cell_changes_the_route():
+    grid = OccupancyGrid.from_rows([".....", ".....", "....."])
+    planner = JumpPointPlanner(grid, grid.node(0, 1), grid.node(4, 1))
+    assert planner.cost == pytest.approx(4.0)
+    for y in (0, 1):
+        grid.set_blocked(2, y)
+    assert planner.run_search()[-1] == grid.node(4, 1)
+    assert planner.cost == pytest.approx(2 + 2 * 2 ** 0.5)
@@ -0,0 +1,72 @@
+import gzip
+import json
+
+import pytest
+
+import helpers
+from compact_map import CompactMap
+from map_loader import build_map_file
+
+
+def write_csv(path, header, rows):
+    path.write_text("\n".join([",".join(header)] + [",".join(str(value) for value in row) for row in rows]) + "\n")
+    return str(path)
+
+
+def roads_of(M):
+    return [sorted(zip(M.roads[node], M.road_lengths[node])) for node in range(len(M.intersections))]
+
+
+def test_csv_matches_from_map_dict(tmp_path):
+    map_dict = helpers.map_40_dict
+    # listed out of order, with every road given from both ends
+    nodes = write_csv(tmp_path / "nodes.csv", ("id", "x", "y"),
+                      [(node, repr(map_dict[node]['pos'][0]), repr(map_dict[node]['pos'][1]))
+                       for node in reversed(range(40))])
+    edges = write_csv(tmp_path / "edges.csv", ("source", "target"),
+                      [(node, con_node) for node in range(40) for con_node in map_dict[node]['connections']])
+    progress = []
+    assert build_map_file(nodes, edges, str(tmp_path / "map_40.map"), chunk_size=16,
+                          progress=lambda *args: progress.append(args))[0] == 40
+    expected = CompactMap.from_map_dict(map_dict)
+    with CompactMap.open(str(tmp_path / "map_40.map")) as M:
+        assert not M.directed
+        assert [M.intersections[node] for node in range(40)] == [expected.intersections[node] for node in range(40)]
+        assert roads_of(M) == roads_of(expected)
+    assert ("nodes", 40, 40) in progress
+
+
+def test_json_lines_gzip_with_costs(tmp_path):
+    with gzip.open(str(tmp_path / "nodes.jsonl.gz"), "wt") as f:
+        for node, x, y in [(0, 0.0, 0.0), (1, 3.0, 4.0), (2, 3.0, 0.0)]:
+            f.write(json.dumps({"id": node, "x": x, "y": y}) + "\n")
+    with open(str(tmp_path / "edges.jsonl"), "w") as f:
+        f.write("[0, 1, 10.0]\n[1, 0, 7.5]\n\n[1, 2]\n")
+    nodes, roads = build_map_file(str(tmp_path / "nodes.jsonl.gz"), str(tmp_path / "edges.jsonl"),
+                                  str(tmp_path / "costs.map"), coord_typecode="f")
+    assert (nodes, roads) == (3, 4)
+    with CompactMap.open(str(tmp_path / "costs.map")) as M:
+        # the duplicate 0-1 road keeps its cheaper cost; 1-2 costs its length
+        assert roads_of(M) == [[(1, 7.5)], [(0, 7.5), (2, 4.0)], [(1, 4.0)]]
+        assert M.heuristic_scale == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize("nodes, edges, message", [
+    ([(0, 0, 0), (2, 1, 1)], [(0, 2)], "numbered 0..1"),
+    ([(0, 0, 0), (0, 1, 1)], [(0, 1)], "numbered 0..1"),
+    ([(0, 0, 0), (1, 1, 1), (1, 2, 2)], [(0, 1)], "numbered 0..2"),
+    ([(0, 0, 0), (2, 1, 1), (2, 2, 2)], [(0, 1)], "listed twice"),
+    ([(0, 0, 0), (1, 1, 1)], [(0, 5)], "unknown node"),
+])
+def test_bad_input_is_rejected(tmp_path, nodes, edges, message):
+    nodes_file = write_csv(tmp_path / "nodes.csv", ("id", "x", "y"), nodes)
+    edges_file = write_csv(tmp_path / "edges.csv", ("source", "target"), edges)
+    with pytest.raises(ValueError, match=message):
+        build_map_file(nodes_file, edges_file, str(tmp_path / "bad.map"))
+
+
+def test_missing_column(tmp_path):
+    nodes_file = write_csv(tmp_path / "nodes.csv", ("id", "x"), [(0, 0)])
+    edges_file = write_csv(tmp_path / "edges.csv", ("source", "target"), [])
+    with pytest.raises(ValueError, match="lacks columns: y"):
+        build_map_file(nodes_file, edges_file, str(tmp_path / "bad.map"))
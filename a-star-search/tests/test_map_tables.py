@@ -0,0 +1,63 @@
+import pytest
+
+import helpers
+from compact_map import CompactMap
+from contraction import ContractionHierarchy
+from jump_point import OccupancyGrid
+from landmarks import LandmarkTable
+from partition import ComponentIndex, PartitionTable
+from spatial_index import KDTree
+
+BUILDERS = [
+    lambda M: LandmarkTable.build(M, count=4),
+    lambda M: ContractionHierarchy.build(M),
+    lambda M: ComponentIndex.build(M),
+    lambda M: PartitionTable.build(M, levels=3),
+    lambda M: KDTree.build(M, leaf_size=4),
+]
+
+
+@pytest.mark.parametrize("build", BUILDERS)
+def test_tables_are_saved_with_the_map(build, tmp_path):
+    M = CompactMap.from_map_dict(helpers.map_40_dict)
+    table = build(M)
+    assert type(table).from_map(M) is None
+    table.attach(M)
+    M.save(str(tmp_path / "tables.map"))
+    with CompactMap.open(str(tmp_path / "tables.map")) as saved:
+        loaded = type(table).from_map(saved)
+        assert [list(values) for values in loaded.extra_arrays()] == \
+            [list(values) for values in table.extra_arrays()]
+
+
+def test_grid_save_and_open(tmp_path):
+    grid = OccupancyGrid.from_rows(["....#", "..#..", "....."])
+    grid.save(str(tmp_path / "floor.grid"))
+    opened = OccupancyGrid.open(str(tmp_path / "floor.grid"))
+    assert (opened.width, opened.height) == (5, 3)
+    assert bytes(opened.bits) == bytes(grid.bits)
+
+
+def test_open_rejects_a_map_without_a_grid(tmp_path):
+    CompactMap.from_map_dict(helpers.map_10_dict).save(str(tmp_path / "plain.map"))
+    with pytest.raises(ValueError, match="occupancy grid"):
+        OccupancyGrid.open(str(tmp_path / "plain.map"))
+
+
+def test_open_rejects_a_grid_file_as_map(tmp_path):
+    OccupancyGrid.from_rows(["..", ".."]).save(str(tmp_path / "floor.grid"))
+    with pytest.raises(ValueError, match="missing map sections"):
+        CompactMap.open(str(tmp_path / "floor.grid"))
+
+
+def test_close_after_attaching_to_an_opened_map(tmp_path):
+    M = CompactMap.from_map_dict(helpers.map_40_dict)
+    KDTree.build(M, leaf_size=4).attach(M)
+    M.save(str(tmp_path / "tables.map"))
+    with CompactMap.open(str(tmp_path / "tables.map")) as opened:
+        LandmarkTable.build(opened, count=4).attach(opened)     # new arrays next to the mapped ones
+        KDTree.build(opened, leaf_size=2).attach(opened)        # replaces mapped extras
+    opened = CompactMap.open(str(tmp_path / "tables.map"))
+    LandmarkTable.build(opened, count=4).attach(opened)
+    opened.close()
+    opened.close()
@@ -0,0 +1,19 @@
+import helpers
+from compact_map import CompactMap
+from conftest import astar
+from jump_point import JumpPointPlanner, OccupancyGrid
+from partition import ComponentIndex
+from search_stats import SearchStats
+
+
+def test_misses_are_returned_not_printed(capsys):
+    M = helpers.load_map_10()     # nodes 8 and 9 are cut off from the rest
+    stats = SearchStats()
+    assert astar.PathPlanner(M, 0, 9, stats=stats).path is False
+    assert astar.PathPlanner(M, 0, 9, bidirectional=True, stats=stats).path is False
+    assert astar.PathPlanner(M, 0, 9, components=ComponentIndex.build(M), stats=stats).path is False
+    assert stats.not_found == stats.count == 3
+    assert astar.PathPlanner(M, 0, 9, weight=2.0).anytime_search() is False
+    assert astar.IncrementalPlanner(CompactMap.from_map(M), 0, 9).path is False
+    assert JumpPointPlanner(OccupancyGrid.from_rows([".#.", ".#.", ".#."]), 0, 2).path is False
+    assert capsys.readouterr().out == ""
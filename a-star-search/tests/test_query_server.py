@@ -0,0 +1,36 @@
+import random
+
+import pytest
+
+import helpers
+from compact_map import CompactMap
+from conftest import astar
+from query_server import QueryExecutor
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_map_matches_path_planner_and_bounds_in_flight(ordered, tmp_path):
+    map_file = str(tmp_path / "map_40.map")
+    M = CompactMap.from_map_dict(helpers.map_40_dict)
+    M.save(map_file)
+    rng = random.Random(0)
+    pairs = [(rng.randrange(40), rng.randrange(40)) for _ in range(50)]
+    consumed = []
+
+    def stream():
+        for pair in pairs:
+            consumed.append(pair)
+            yield pair
+
+    results = []
+    with QueryExecutor(map_file, workers=2, batch_size=3, max_pending=2) as executor:
+        for result in executor.map(stream(), ordered=ordered):
+            results.append(result)
+            assert len(consumed) - len(results) < executor.max_pending * executor.batch_size
+    if ordered:
+        assert [(start, goal) for start, goal, _, _ in results] == pairs
+    assert sorted((start, goal) for start, goal, _, _ in results) == sorted(pairs)
+    for start, goal, path, cost in results:
+        planner = astar.PathPlanner(M, start, goal, open_set="heap")
+        assert path == planner.path
+        assert cost == pytest.approx(planner.get_gScore(goal))
@@ -0,0 +1,57 @@
+import pytest
+
+import helpers
+from compact_map import CompactMap
+from conftest import astar
+from route_cache import RouteCache
+
+
+def test_lru_eviction_and_counters(map_40):
+    cache = RouteCache(maxsize=2)
+    cache.put(map_40, 0, 1, [0, 1], [0.0, 1.0])
+    cache.put(map_40, 2, 3, [2, 3], [0.0, 2.0])
+    assert cache.get(map_40, 0, 1) == ([0, 1], 1.0)
+    cache.put(map_40, 4, 5, [4, 5], [0.0, 3.0])     # evicts 2-3, the least recently used
+    assert cache.get(map_40, 2, 3) is None
+    assert cache.get(map_40, 4, 5) == ([4, 5], 3.0)
+    assert cache.stats() == {'size': 2, 'maxsize': 2, 'hits': 2, 'subpath_hits': 0, 'misses': 1,
+                             'hit_rate': pytest.approx(2 / 3.0)}
+    with pytest.raises(ValueError):
+        RouteCache(maxsize=0)
+
+
+def test_subpaths_in_both_directions(map_40):
+    cache = RouteCache()
+    cache.put(map_40, 5, 34, [5, 16, 37, 12, 34], [0.0, 1.0, 3.0, 6.0, 10.0])
+    assert cache.get(map_40, 16, 12) == ([16, 37, 12], 5.0)
+    assert cache.get(map_40, 12, 16) == ([12, 37, 16], 5.0)
+    assert cache.subpath_hits == 2
+
+
+def test_planner_results_are_served_and_invalidated(map_40):
+    cache = RouteCache()
+    planner = astar.PathPlanner(map_40, 5, 34, open_set="heap", cache=cache)
+    first = planner.path
+    # a stretch of the route is answered from the cache without searching
+    assert astar.PathPlanner(map_40, first[1], first[-2], cache=cache).path == first[1:-1]
+    assert cache.subpath_hits == 1
+    planner.set_start(8)
+    planner.set_goal(24)
+    assert planner.path == astar.PathPlanner(map_40, 8, 24).path
+    assert len(cache) == 2
+    planner.set_map(CompactMap.from_map_dict(helpers.map_40_dict))
+    assert len(cache) == 0
+
+
+def test_version_bump_hides_older_routes(map_40):
+    cache = RouteCache()
+    cache.put(map_40, 0, 1, [0, 1], [0.0, 1.0])
+    map_40.version = 1
+    assert cache.get(map_40, 0, 1) is None
+
+
+def test_unreachable_routes_are_cached():
+    M = helpers.load_map_10()
+    cache = RouteCache()
+    assert astar.PathPlanner(M, 0, 9, open_set="heap", cache=cache).path is False
+    assert cache.get(M, 0, 9) == (None, float('inf'))
@@ -0,0 +1,16 @@
+import helpers
+from conftest import astar
+from search_stats import SearchStats
+
+
+def test_distance_matrix_rows_count_reached_targets():
+    M = helpers.load_map_10()     # nodes 8 and 9 are cut off from the rest
+    stats = SearchStats()
+    planner = astar.PathPlanner(M, stats=stats)
+    (row,) = planner.distance_matrix([0], [1, 5, 9])
+    record = stats.queries[-1]
+    assert (record.found, record.reached) == (True, 2)
+    assert record.cost == max(row[:2])
+    planner.distance_matrix([0], [8, 9])
+    assert stats.queries[-1].as_dict()['reached'] == 0
+    assert stats.not_found == 1
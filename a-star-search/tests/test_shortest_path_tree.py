@@ -0,0 +1,25 @@
+import networkx as nx
+
+from conftest import astar
+
+
+def test_tree_matches_dijkstra(map_40, graph_40):
+    tree = astar.PathPlanner(map_40).shortest_path_tree(5)
+    expected = nx.single_source_dijkstra_path_length(graph_40, 5, weight='length')
+    for target in range(len(map_40.roads)):
+        if target not in expected:
+            assert tree.path_to(target) is None
+            continue
+        path = tree.path_to(target)
+        assert path[0] == 5 and path[-1] == target
+        assert abs(tree.distance_to(target) - expected[target]) < 1e-9
+        assert abs(nx.path_weight(graph_40, path, 'length') - expected[target]) < 1e-9
+
+
+def test_tree_cache_is_opt_in_and_bounded(map_40):
+    planner = astar.PathPlanner(map_40)
+    assert planner.shortest_path_tree(0) is not planner.shortest_path_tree(0)
+    trees = [planner.shortest_path_tree(source, cache=True) for source in range(planner.TREE_CACHE_SIZE + 1)]
+    assert planner.shortest_path_tree(1) is trees[1]
+    assert planner.shortest_path_tree(0, cache=True) is not trees[0]
+    assert len(planner._trees) == planner.TREE_CACHE_SIZE
@@ -0,0 +1,28 @@
+import random
+
+import pytest
+
+from compact_map import CompactMap
+from spatial_index import KDTree
+
+
+def scan(M, x, y):
+    return sorted(M.intersections.keys(),
+                  key=lambda node: ((M.intersections[node][0] - x)**2 + (M.intersections[node][1] - y)**2, node))
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_queries_match_a_full_scan(map_40, compact, tmp_path):
+    M = map_40
+    if compact:
+        CompactMap.from_map(map_40).save(str(tmp_path / "map_40.map"))
+        M = CompactMap.open(str(tmp_path / "map_40.map"))
+        KDTree.build(M, leaf_size=2).attach(M)
+    tree = KDTree.from_map(M) if compact else KDTree.build(M, leaf_size=2)
+    rng = random.Random(0)
+    points = [(rng.uniform(-0.1, 1.1), rng.uniform(-0.1, 1.1)) for _ in range(200)]
+    for x, y in points:
+        expected = scan(M, x, y)
+        assert tree.nearest(x, y) == expected[0]
+        assert tree.k_nearest(x, y, 5) == expected[:5]
+    assert tree.nearest_many(points) == [scan(M, x, y)[0] for x, y in points]
@@ -0,0 +1,100 @@
+"""NumPy-backed A* engine.
+
+VectorPlanner works on the CSR arrays of a CompactMap. The heuristic for a
+goal is computed for every node in one vectorised pass over the coordinate
+arrays, and the roads of each expanded node are relaxed with array
+operations instead of a Python loop per neighbor. Only improved neighbors
+go back through Python, to be pushed on the heap.
+
+This pays off on high-degree nodes; on sparse maps the per-call overhead of
+NumPy dominates and PathPlanner is faster. benchmark_vector.py measures the
+crossover degree.
+
+NumPy is optional for the rest of the package and only required here.
+"""
+import heapq
+
+try:
+    import numpy as np
+except ImportError:     # numpy is optional, only this engine needs it
+    np = None
+
+from compact_map import CompactMap
+
+
+class VectorPlanner(object):
+    """A* over NumPy views of a map's CSR arrays"""
+    def __init__(self, M):
+        if np is None:
+            raise ImportError("VectorPlanner requires numpy")
+        if not isinstance(M, CompactMap):
+            M = CompactMap.from_map(M)
+        self.map = M
+        # np.asarray shares an array.array or memoryview buffer whose type already
+        # matches; float32 coordinates and costs are copied to float64 arrays
+        self.xs = np.asarray(M.xs, dtype=np.float64)
+        self.ys = np.asarray(M.ys, dtype=np.float64)
+        self.neighbors = np.asarray(M.neighbors)
+        self.lengths = np.asarray(M.lengths, dtype=np.float64)
+        self.heuristic_scale = M.heuristic_scale
+        self._goal = None
+        self._hScore = None
+
+    def heuristic_to(self, goal):
+        """Return the straight-line estimate from every node to goal as one array"""
+        if goal != self._goal:
+            self._hScore = np.hypot(self.xs - self.xs[goal], self.ys - self.ys[goal]) * self.heuristic_scale
+            self._goal = goal
+        return self._hScore
+
+    def search(self, start, goal):
+        """Return (path, cost) from start to goal, or (None, inf) if goal is unreachable"""
+        n = len(self.xs)
+        hScore = self.heuristic_to(goal)
+        gScore = np.full(n, np.inf)
+        cameFrom = np.full(n, -1, dtype=np.int64)
+        closed = bytearray(n)           # read once per pop; cheaper than a NumPy scalar read
+        offsets, neighbors, lengths = self.map.offsets, self.neighbors, self.lengths
+        gScore[start] = 0.0
+        heap = [(float(hScore[start]), 0.0, start)]
+        while heap:
+            _, g, current = heapq.heappop(heap)
+            if closed[current]:
+                continue
+            if current == goal:
+                return self._path_to(cameFrom, goal), g
+            closed[current] = 1
+            begin, end = offsets[current], offsets[current + 1]
+            roads = neighbors[begin:end]
+            tentative = g + lengths[begin:end]
+            # closed nodes never improve under a consistent heuristic, so the
+            # comparison alone filters them out
+            better = np.flatnonzero(tentative < gScore[roads])
+            if not better.size:
+                continue
+            improved = roads[better]
+            tentative = tentative[better]
+            gScore[improved] = tentative
+            cameFrom[improved] = current
+            for f, g, node in zip((tentative + hScore[improved]).tolist(), tentative.tolist(), improved.tolist()):
+                heapq.heappush(heap, (f, g, node))
+        return None, float('inf')
+
+    def search_many(self, pairs):
+        """Answer (start, goal) queries in order, returns (paths, costs) like PathPlanner.search_many"""
+        paths = []
+        costs = []
+        for start, goal in pairs:
+            path, cost = self.search(start, goal)
+            paths.append(path)
+            costs.append(cost)
+        return paths, costs
+
+    @staticmethod
+    def _path_to(cameFrom, node):
+        path = [node]
+        while cameFrom[node] != -1:
+            node = int(cameFrom[node])
+            path.append(node)
+        path.reverse()
+        return path
@@ -33,6 +33,22 @@ units = extract_units(unitlist, boxes)
 peers = extract_peers(units, boxes)
 
 
+# Integer tables for the bitmask backend. Boxes are indexes 0-80 in the order of
+# boxes, and the candidates of a box are a 9-bit mask with bit d-1 set for digit d.
+box_index = {box: i for i, box in enumerate(boxes)}
+unit_indexes = [[box_index[box] for box in unit] for unit in unitlist]
+peer_indexes = [sorted(box_index[peer] for peer in peers[box]) for box in boxes]
+box_units = [[u for u, unit in enumerate(unitlist) if box in unit] for box in boxes]
+# boxes that are peers of both a and b, for every pair of peers a < b
+common_peers = {(a, b): sorted(set(peer_indexes[a]) & set(peer_indexes[b]))
+                for a in range(len(boxes)) for b in peer_indexes[a] if a < b}
+ALL_DIGITS = (1 << len(cols)) - 1
+digit_masks = {digit: 1 << i for i, digit in enumerate(cols)}
+mask_digits = [''.join(digit for digit in cols if mask & digit_masks[digit]) for mask in range(ALL_DIGITS + 1)]
+bit_count = [len(digits) for digits in mask_digits]
+box_bits = [1 << i for i in range(len(boxes))]     # a box's flag in propagate_masks' queued set
+
+
 def naked_twins(values):
     """Eliminate values using the naked twins strategy.
 
@@ -230,7 +246,227 @@ def search(values):
     #raise NotImplementedError
 
 
-def solve(grid):
+def values2masks(values):
+    """Convert a values dictionary into a list of 81 candidate masks"""
+    return [sum(digit_masks[digit] for digit in values[box]) for box in boxes]
+
+
+def masks2values(masks):
+    """Convert a list of 81 candidate masks back into a values dictionary"""
+    return {box: mask_digits[mask] for box, mask in zip(boxes, masks)}
+
+
+def propagate_masks(masks, changed, trail=None):
+    """Propagate the constraints from the boxes in changed, whose candidates changed.
+
+    Instead of sweeping the whole board like reduce_puzzle, a work queue holds
+    the boxes whose candidates changed and the units they belong to. A changed
+    box that is solved removes its digit from its peers (eliminate), one left
+    with two candidates looks for a naked twin among its peers, and a unit is
+    rescanned for digits with a single place left (only choice) only after one
+    of its boxes changed. Every removal queues the box it was removed from, so
+    the work done is proportional to the changes, not to the board size.
+
+    If trail is given, the index and previous mask of every box changed are
+    appended to it, so the changes can be undone with undo_masks.
+
+    Parameters
+    ----------
+    masks(list)
+        81 candidate masks, modified in place
+    changed(iterable)
+        indexes of the boxes to propagate from
+    trail(list)
+        optional undo trail of box index, previous mask pairs
+
+    Returns
+    -------
+    list or False
+        masks, or False if a box or a unit runs out of candidates
+    """
+    # queued is a bitmask of the boxes in queue, so no box is queued twice
+    queue = []
+    queued = 0
+    for i in changed:
+        if not queued & box_bits[i]:
+            queued |= box_bits[i]
+            queue.append(i)
+    dirty_units = set()
+    while queue or dirty_units:
+        while queue:
+            i = queue.pop()
+            queued ^= box_bits[i]
+            mask = masks[i]
+            if not mask:
+                return False
+            if not mask & (mask - 1):
+                targets = peer_indexes[i]
+            elif bit_count[mask] == 2:
+                targets = [peer for twin in peer_indexes[i] if masks[twin] == mask
+                           for peer in common_peers[min(i, twin), max(i, twin)]
+                           if bit_count[masks[peer]] > 1 and masks[peer] != mask]
+            else:
+                targets = ()
+            for peer in targets:
+                if masks[peer] & mask:
+                    if trail is not None:
+                        trail.append(peer)
+                        trail.append(masks[peer])
+                    masks[peer] &= ~mask
+                    if not masks[peer]:
+                        return False
+                    if not queued & box_bits[peer]:
+                        queued |= box_bits[peer]
+                        queue.append(peer)
+            dirty_units.update(box_units[i])
+        if dirty_units:
+            unit = unit_indexes[dirty_units.pop()]
+            seen = twice = solved = 0
+            for i in unit:
+                mask = masks[i]
+                twice |= seen & mask
+                seen |= mask
+                if not mask & (mask - 1):
+                    solved |= mask
+            if seen != ALL_DIGITS:
+                return False
+            # digits with one place left that is not yet solved
+            once = ALL_DIGITS & ~(twice | solved)
+            if once:
+                for i in unit:
+                    mask = masks[i] & once
+                    if mask:
+                        if mask & (mask - 1):
+                            return False
+                        if trail is not None:
+                            trail.append(i)
+                            trail.append(masks[i])
+                        masks[i] = mask
+                        if not queued & box_bits[i]:
+                            queued |= box_bits[i]
+                            queue.append(i)
+    return masks
+
+
+def reduce_masks(masks):
+    """Bitmask version of reduce_puzzle: propagate from every box; returns the masks or False"""
+    return propagate_masks(masks, range(len(masks)))
+
+
+def fewest_candidates(masks):
+    """Index of the first unfilled box with the fewest candidates, or None if all are filled"""
+    best, fewest = None, len(cols) + 1
+    for i, mask in enumerate(masks):
+        n = bit_count[mask]
+        if 1 < n < fewest:
+            best, fewest = i, n
+            if n == 2:
+                break
+    return best
+
+
+def search_masks(masks):
+    """Bitmask version of search on reduced masks; returns the solved masks or False"""
+    i = fewest_candidates(masks)
+    if i is None:
+        return masks ## Solved!
+    candidates = masks[i]
+    while candidates:
+        digit = candidates & -candidates
+        candidates ^= digit
+        new_masks = list(masks)
+        new_masks[i] = digit
+        # only the chosen box changed, so only its consequences are propagated
+        if propagate_masks(new_masks, [i]) is not False:
+            attempt = search_masks(new_masks)
+            if attempt:
+                return attempt
+    return False
+
+
+def undo_masks(masks, trail, mark):
+    """Restore the masks changed since the trail was mark entries long"""
+    while len(trail) > mark:
+        mask = trail.pop()
+        masks[trail.pop()] = mask
+
+
+def search_masks_in_place(masks, trail):
+    """Bitmask version of search that changes one list of reduced masks in place.
+
+    Every change is recorded on trail and undone when its branch fails, so
+    no board is copied. Returns True with masks solved, or False with masks
+    restored."""
+    i = fewest_candidates(masks)
+    if i is None:
+        return True ## Solved!
+    candidates = masks[i]
+    mark = len(trail)
+    while candidates:
+        digit = candidates & -candidates
+        candidates ^= digit
+        trail.append(i)
+        trail.append(masks[i])
+        masks[i] = digit
+        if propagate_masks(masks, [i], trail) is not False and search_masks_in_place(masks, trail):
+            return True
+        undo_masks(masks, trail, mark)
+    return False
+
+
+def search_bitmask(values):
+    """Apply depth first search and propagation like search, on candidate bitmasks.
+
+    Candidates are 9-bit integers in a flat list indexed like boxes, and peers
+    and units are precomputed index lists, so a propagation step is a few
+    integer operations instead of string replace calls and dictionary lookups.
+
+    Parameters
+    ----------
+    values(dict)
+        a dictionary of the form {'box_name': '123456789', ...}
+
+    Returns
+    -------
+    dict or False
+        The values dictionary with all boxes assigned or False
+    """
+    masks = reduce_masks(values2masks(values))
+    if masks is False:
+        return False
+    masks = search_masks(masks)
+    if masks is False:
+        return False
+    return masks2values(masks)
+
+
+def search_trail(values):
+    """Apply depth first search and propagation like search_bitmask, on one board.
+
+    Branches change the candidate masks in place and undo their changes from
+    a trail when they fail, instead of copying the board for every node of
+    the search tree.
+
+    Parameters
+    ----------
+    values(dict)
+        a dictionary of the form {'box_name': '123456789', ...}
+
+    Returns
+    -------
+    dict or False
+        The values dictionary with all boxes assigned or False
+    """
+    masks = reduce_masks(values2masks(values))
+    if masks is False or not search_masks_in_place(masks, []):
+        return False
+    return masks2values(masks)
+
+
+solvers = {'dict': search, 'bitmask': search_bitmask, 'trail': search_trail}
+
+
+def solve(grid, backend='dict'):
     """Find the solution to a Sudoku puzzle using search and constraint propagation
 
     Parameters
@@ -240,13 +476,20 @@ def solve(grid):
         
         Ex. '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
 
+    backend(string)
+        'dict' to search on the values dictionary, 'bitmask' to search on
+        candidate bitmasks, which is much faster, or 'trail' to search on
+        bitmasks changed in place and undone on backtracking
+
     Returns
     -------
     dict or False
         The dictionary representation of the final sudoku grid or False if no solution exists.
     """
+    if backend not in solvers:
+        raise ValueError("backend must be one of %s, got %r" % (", ".join(sorted(solvers)), backend))
     values = grid2values(grid)
-    values = search(values)
+    values = solvers[backend](values)
     return values
 
 
@@ -0,0 +1,68 @@
+"""All Sudoku search backends against each other and the puzzle rules.
+
+sudoku-solution.py needs the project's utils.py next to it; without it
+these tests are skipped."""
+import importlib.util
+import os
+import random
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, HERE)
+pytest.importorskip("utils")
+
+_spec = importlib.util.spec_from_file_location("sudoku_solution", os.path.join(HERE, "sudoku-solution.py"))
+sudoku = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(sudoku)
+
+DIAGONAL = '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+BACKENDS = sorted(sudoku.solvers)
+
+
+def is_solution(values, grid):
+    if not values:
+        return False
+    if any(sorted(values[box] for box in unit) != list('123456789') for unit in sudoku.unitlist):
+        return False
+    return all(given == '.' or values[box] == given for box, given in zip(sudoku.boxes, grid))
+
+
+def puzzles(count, seed=0):
+    """Random diagonal Sudoku puzzles with 17 to 30 givens cut from full solutions"""
+    rng = random.Random(seed)
+    found = []
+    while len(found) < count:
+        values = sudoku.grid2values('.' * 81)
+        for box in rng.sample(sudoku.boxes, 8):
+            values[box] = rng.choice('123456789')
+        solution = sudoku.search_bitmask(values)
+        if solution:
+            keep = set(rng.sample(sudoku.boxes, rng.randint(17, 30)))
+            found.append(''.join(solution[box] if box in keep else '.' for box in sudoku.boxes))
+    return found
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_solves_the_diagonal_sudoku(backend):
+    assert is_solution(sudoku.solve(DIAGONAL, backend), DIAGONAL)
+
+
+@pytest.mark.parametrize("grid", puzzles(15))
+def test_backends_agree(grid):
+    results = [sudoku.solve(grid, backend) for backend in BACKENDS]
+    assert len(set(bool(values) for values in results)) == 1
+    for values in results:
+        assert not values or is_solution(values, grid)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_contradictions_have_no_solution(backend):
+    assert not sudoku.solve('11' + '.' * 79, backend)
+    assert not sudoku.solve(DIAGONAL[:-2] + '33', backend)
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        sudoku.solve(DIAGONAL, 'simd')